@@ -21,7 +21,7 @@ limitations under the License.
 from pyscript import js_import
 from pyscript import storage
 from .channels import Message, subscribe, publish, unsubscribe
-from .datastore import DataStore, IndexDBBackend
+from .datastore import DataStore, IndexDBBackend, JournalBackend
 from .i18n import _, load_translations
 from .media import Media, set_media_root, get_media_root
 from .app import App
@@ -69,6 +69,11 @@ async def start_datastore(_backend=None, **kwargs):
             backend_instance = await storage(
                 datastore_name, storage_class=_backend
             )
+        elif _backend == JournalBackend:
+            # A journal kept in its own IndexDB storage, recovered on start.
+            backend_instance = JournalBackend(
+                await storage(f"{datastore_name}-journal")
+            )
         else:
             # Another given storage backend.
             backend_instance = _backend()
@@ -1,6 +1,50 @@
 """
 A very simple PubSub message bus for the Invent framework.
 
+Handlers `subscribe` to channels to hear about messages with certain subjects,
+and `publish` sends a `Message` to every handler listening for its subject on
+the given channel[s]. Handlers stop listening via `unsubscribe`.
+
+Channel names may be hierarchical, with parts separated by `/` (for example,
+`"sensor/kitchen/temperature"`). Subscriptions may use wildcards to listen to
+many channels or subjects at once:
+
+* `"*"` as a subject matches every subject sent to the channel.
+* `"*"` as a part of a channel name matches any single part, so
+  `"sensor/*"` matches `"sensor/kitchen"` but not `"sensor/kitchen/fridge"`.
+* `"**"` as the last part of a channel name matches one or more trailing
+  parts, so `"sensor/**"` matches every channel under `"sensor"`.
+
+Busy channels (such as a stream of readings from a sensor) can be set to
+`coalesce` their messages, so handlers are called at most once per frame
+drawn by the browser rather than once per message. Call `flush` to deliver
+any such waiting messages straight away.
+
+Handlers belonging to short-lived objects (such as widgets on a page that is
+rebuilt) may be subscribed with `weak=True`, so the subscription doesn't keep
+them alive. Subscriptions whose handlers have gone are forgotten, either
+when next met while publishing or by calling `compact`.
+
+Asynchronous handlers receive messages through a queue of limited size, and
+are called in the order messages were published. Use `configure_queue` to
+change the size of the queue, the number of messages handled at once, and
+what happens when the queue is full. Use `apublish` to wait for room in
+such queues, and `queue_stats` to see how busy they are.
+
+Messages describing the current state of something (such as whether a
+connection is open) may be published with `retain=True`. The latest such
+message for each channel and subject is kept, so a handler subscribed later
+with `replay=True` hears about the current state straight away.
+
+Handlers reacting to rapid input (such as typing, or dragging a slider) may
+be subscribed with `debounce_ms` (called once the messages pause) or
+`throttle_ms` (called at most once in each period). The same behaviour is
+available outside subscriptions via `debounce` and `throttle`. All such
+handlers share a single browser timer.
+
+To find out which channels are busy and which handlers are slow, call
+`enable_stats` and then read the numbers via `stats` (or `stats_json`).
+
 ```
 Copyright (c) 2019-present Invent contributors.
 
@@ -19,20 +63,366 @@ limitations under the License.
 """
 
 import asyncio
+import collections
+import heapq
+import json
 
-from .utils import iscoroutinefunction
+try:
+    import weakref
+except ImportError:  # pragma: no cover
+    # MicroPython has no weak references, so weak subscriptions are strong.
+    weakref = None
+from pyscript import window
+from pyscript.ffi import create_proxy
+from .utils import iscoroutinefunction, timer, elapsed_ms
 
 __all__ = [
     "Message",
     "subscribe",
     "publish",
     "unsubscribe",
+    "has_subscribers",
+    "coalesce",
+    "flush",
+    "compact",
+    "apublish",
+    "configure_queue",
+    "queue_stats",
+    "enable_stats",
+    "disable_stats",
+    "reset_stats",
+    "stats",
+    "stats_json",
+    "set_retain_limit",
+    "clear_retained",
+    "debounce",
+    "throttle",
+    "WILDCARD",
+    "DEEP_WILDCARD",
+    "LATEST",
+    "ACCUMULATE",
+    "DROP_OLDEST",
+    "DROP_NEWEST",
+    "BLOCK",
 ]
 
 
-# Defines how channels / messages are linked to handler functions.
+#: Separates the parts of a hierarchical channel name.
+SEPARATOR = "/"
+#: Matches any subject, or any single part of a channel name.
+WILDCARD = "*"
+#: Matches one or more trailing parts of a channel name.
+DEEP_WILDCARD = "**"
+#: Coalescing policy: only the latest message per subject is delivered.
+LATEST = "latest"
+#: Coalescing policy: all messages per subject are delivered as one list.
+ACCUMULATE = "accumulate"
+#: Milliseconds between flushes of coalesced messages when the browser's
+#: `requestAnimationFrame` isn't available (about 60 times a second).
+FLUSH_INTERVAL = 16
+#: Overflow policy: make room in a full queue by dropping the oldest message.
+DROP_OLDEST = "drop-oldest"
+#: Overflow policy: drop the new message if the queue is full.
+DROP_NEWEST = "drop-newest"
+#: Overflow policy: `apublish` waits until there is room in the queue.
+BLOCK = "block"
+#: The default number of messages an asynchronous handler's queue may hold.
+DEFAULT_QUEUE_SIZE = 1000
+#: Handlers taking longer than this many milliseconds are reported as slow.
+#: A frame drawn by the browser at 60 frames per second lasts about 16ms.
+DEFAULT_SLOW_HANDLER_MS = 16
+#: The upper bounds, in milliseconds, of the buckets used to count how long
+#: handlers take. A final bucket counts anything slower.
+HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+#: The default limit, in (approximate) bytes, of the memory used to keep
+#: retained messages.
+DEFAULT_RETAIN_LIMIT = 256 * 1024
+#: The most combinations of channel and subject for which the handlers to
+#: call are remembered.
+MAX_CACHED_SNAPSHOTS = 1024
+#: The most combinations of channels and subjects for which the handlers
+#: of a de-duplicated publish are remembered.
+MAX_CACHED_UNIONS = 512
+
+
+# Defines how channels / messages are linked to handler functions. Keys are
+# exact channel names, values are dictionaries mapping subjects to sets of
+# handlers (or weak references to handlers).
 _channels = {}
 
+# The type of weak references to handlers (an empty tuple matches nothing
+# when passed to `isinstance`, for interpreters without weak references).
+_REF_TYPE = weakref.ref if weakref else ()
+# The number of weakly referenced handlers that have gone since the last
+# compaction.
+_collected = 0
+# Snapshots of the handlers to call for each (channel, subject), as tuples of
+# (entry, weak, is_async) built by `_snapshot`. Forgotten whenever
+# subscriptions change, so publishing never iterates over a set that a
+# handler might change.
+_snapshots = {}
+# Snapshots of the handlers listening to any of several channels, for
+# publishing with `dedupe=True`. Keyed by (tuple of channels, subject), and
+# forgotten whenever subscriptions change.
+_unions = {}
+
+
+class _Node:
+    """
+    A node in the trie of channel names containing wildcards.
+
+    Each node holds its `children`, keyed by the next part of the channel name
+    (including `WILDCARD` and `DEEP_WILDCARD` parts), and the `subjects` of
+    handlers subscribed to the pattern ending at this node.
+    """
+
+    def __init__(self):
+        self.children = {}
+        self.subjects = {}
+
+
+# The root of the trie of channel patterns (i.e. names containing wildcards).
+_patterns = _Node()
+
+# Coalescing policies, keyed by channel name.
+_coalesced = {}
+# Messages waiting for the next flush. Keys are channel names, values are
+# ordered dictionaries mapping subjects to the latest message (for `LATEST`)
+# or a list of messages (for `ACCUMULATE`).
+_pending = {}
+# Indicates if a flush of pending messages has been requested.
+_flush_scheduled = False
+
+# Queues of messages for asynchronous handlers, keyed by handler. Queues are
+# removed once they have no more work to do.
+_queues = {}
+# Queue settings for specific handlers, as given to `configure_queue`.
+_queue_settings = {}
+# Running totals for queues that have since been removed.
+_queue_totals = {"processed": 0, "dropped": 0}
+
+# Statistics about channels and handlers, or `None` when not recording.
+_stats = None
+
+# Retained messages, keyed by (channel, subject), oldest first. Values are
+# (message, size) tuples.
+_retained = collections.OrderedDict()
+# The approximate size of all retained messages, and the limit to that size.
+_retained_size = 0
+_retain_limit = DEFAULT_RETAIN_LIMIT
+
+# Debounced and throttled handlers waiting for time to pass, as a heap of
+# (deadline, sequence number, limiter) tuples. The sequence number keeps
+# limiters with the same deadline in order.
+_limiters = []
+_limiter_count = 0
+# The handle of the single browser timer used for all limiters, and when
+# (in milliseconds, as given by `_now`) it is due.
+_timer_handle = None
+_timer_due = None
+
+
+class _Queue:
+    """
+    Messages waiting to be handled by an asynchronous `handler`.
+
+    At most `max_size` messages wait in the queue, and at most `concurrency`
+    messages are handled at the same time. When the queue is full, the
+    `overflow` policy decides what happens to new messages.
+
+    MicroPython's `asyncio` has no `Queue` class, so a list and an
+    `asyncio.Event` (to wake any publishers waiting for room) are used
+    instead.
+    """
+
+    def __init__(
+        self,
+        handler,
+        max_size=DEFAULT_QUEUE_SIZE,
+        concurrency=1,
+        overflow=DROP_OLDEST,
+    ):
+        self.handler = handler
+        self.max_size = max_size
+        self.concurrency = concurrency
+        self.overflow = overflow
+        self.messages = []
+        self.running = 0
+        self.processed = 0
+        self.dropped = 0
+        self._space = asyncio.Event()
+
+    def is_full(self):
+        """
+        Return `True` if no more messages fit into the queue.
+        """
+        return len(self.messages) >= self.max_size
+
+    def put(self, message):
+        """
+        Add the `message` to the queue, following the `overflow` policy if
+        the queue is full, and make sure it will be handled.
+
+        `BLOCK` can't wait here, so it behaves like `DROP_NEWEST`. Use
+        `wait_for_space` first to avoid dropping the message.
+        """
+        if self.is_full():
+            self.dropped += 1
+            if self.overflow == DROP_OLDEST:
+                self.messages.pop(0)
+            else:
+                return
+        self.messages.append(message)
+        while self.running < min(self.concurrency, len(self.messages)):
+            self.running += 1
+            asyncio.create_task(self._work())
+
+    async def wait_for_space(self):
+        """
+        If the `overflow` policy is `BLOCK`, wait until the queue has room
+        for another message.
+        """
+        while self.overflow == BLOCK and self.is_full():
+            self._space.clear()
+            await self._space.wait()
+
+    async def _work(self):
+        """
+        Handle waiting messages in order until the queue is empty. If the
+        handler raises an exception, it is reported to the browser's console
+        and the next message is handled.
+        """
+        try:
+            while self.messages:
+                message = self.messages.pop(0)
+                self._space.set()
+                start = timer() if _stats is not None else None
+                try:
+                    await self.handler(message)
+                except Exception as ex:
+                    window.console.error(
+                        f"Error in handler {_handler_name(self.handler)}: "
+                        f"{ex}"
+                    )
+                if start is not None:
+                    _record_handler(self.handler, elapsed_ms(start))
+                self.processed += 1
+        finally:
+            self.running -= 1
+            if not self.running and not self.messages:
+                _retire_queue(self)
+
+
+class _Limiter:
+    """
+    Debounces or throttles calls to a `handler` (which may be a weak
+    reference to the handler).
+
+    When debouncing, the `interval` (in milliseconds) restarts with every
+    call, so the handler waits for calls to pause. When throttling, the
+    interval is fixed, so the handler is called at most once per interval.
+    The `leading` and `trailing` flags decide if the handler is called at the
+    start and/or the end of the interval. The trailing call is given the
+    latest message.
+
+    Restarting a debounce interval only moves the `deadline`. The limiter
+    keeps its place in the shared timer's heap until then, and is
+    re-scheduled for the new deadline, so typing quickly doesn't create a
+    timer (or task) per keypress.
+    """
+
+    def __init__(self, handler, interval, debounce, leading, trailing):
+        self.handler = handler
+        self.interval = interval
+        self.debounce = debounce
+        self.leading = leading
+        self.trailing = trailing
+        # The deadline of the current interval, or None if idle.
+        self.deadline = None
+        # Indicates if the limiter is in the shared timer's heap.
+        self.scheduled = False
+        # The latest message waiting for a trailing call.
+        self.waiting = False
+        self.message = None
+
+    def __call__(self, message):
+        """
+        Handle the `message`, either by calling the handler straight away or
+        keeping it for the end of the interval.
+        """
+        now = _now()
+        if self.deadline is None:
+            self.deadline = now + self.interval
+            _schedule(self)
+            if self.leading:
+                self._fire(message)
+                return
+        elif self.debounce:
+            self.deadline = now + self.interval
+        self.waiting = True
+        self.message = message
+
+    def wraps(self, handler):
+        """
+        Return `True` if the limiter calls the given `handler`.
+        """
+        return self._resolve() == handler
+
+    def is_dead(self):
+        """
+        Return `True` if the handler was weakly referenced and has gone.
+        """
+        return isinstance(self.handler, _REF_TYPE) and self.handler() is None
+
+    def cancel(self):
+        """
+        Forget any message waiting for a trailing call, and end the interval.
+        """
+        self.deadline = None
+        self.waiting = False
+        self.message = None
+
+    def expire(self, now):
+        """
+        Called by the shared timer once the deadline may have passed.
+        """
+        if self.deadline is None:
+            return
+        if now < self.deadline:
+            # The debounce interval was restarted.
+            _schedule(self)
+            return
+        if not (self.waiting and self.trailing):
+            self.cancel()
+            return
+        message = self.message
+        self.waiting = False
+        self.message = None
+        if self.debounce:
+            self.deadline = None
+        else:
+            # A trailing call starts a new throttling interval.
+            self.deadline = now + self.interval
+            _schedule(self)
+        self._fire(message)
+
+    def _resolve(self):
+        """
+        Return the handler, or `None` if it was weakly referenced and has
+        gone.
+        """
+        if isinstance(self.handler, _REF_TYPE):
+            return self.handler()
+        return self.handler
+
+    def _fire(self, message):
+        """
+        Pass the `message` to the handler.
+        """
+        handler = self._resolve()
+        if handler is not None:
+            _deliver(handler, message)
+
 
 class Message:
     """
@@ -40,22 +430,301 @@ class Message:
 
     The message's subject ("click", "slide", "whatever") becomes the
     thing to which to listen for (i.e. the `when_subject` when subscribing).
+
+    Any other keyword arguments become the message's content, read as
+    attributes (e.g. `message.value`). Messages are created very often (for
+    every click, keypress or change in the datastore), so the content is
+    kept in a single dictionary and looked up only when asked for. Treat a
+    message as read-only once it has been published.
     """
 
+    # Ignored by MicroPython, but on CPython avoids a per-instance __dict__.
+    __slots__ = ("_subject", "_payload")
+
     def __init__(self, subject, **kwargs):
         self._subject = subject
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+        self._payload = kwargs
+
+    def __getattr__(self, name):
+        """
+        Return the content of the message with the given `name`. Only called
+        when `name` isn't found in the usual way.
+        """
+        if name == "_payload":
+            # Not yet set, so avoid infinite recursion.
+            raise AttributeError(name)
+        try:
+            return self._payload[name]
+        except KeyError:
+            raise AttributeError(name)
 
     def __str__(self):
         result = self._subject + " "
         result += str(
-            {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+            {k: v for k, v in self._payload.items() if not k.startswith("_")}
         )
         return result
 
 
-def subscribe(handler, to_channel, when_subject):
+def _as_list(names):
+    """
+    Normalise a string, or list of strings, into a list of strings.
+    """
+    if isinstance(names, str):
+        return [
+            names,
+        ]
+    return names
+
+
+def _pattern_parts(channel):
+    """
+    Return the parts of the `channel` name if it contains wildcards, otherwise
+    return `None` to show it is an exact channel name.
+
+    Raises a `ValueError` if `DEEP_WILDCARD` is used anywhere other than as
+    the last part of the name.
+    """
+    if WILDCARD not in channel:
+        return None
+    parts = channel.split(SEPARATOR)
+    if DEEP_WILDCARD in parts[:-1]:
+        raise ValueError(
+            f"'{DEEP_WILDCARD}' must be the last part of a channel: {channel}"
+        )
+    if WILDCARD in parts or DEEP_WILDCARD in parts:
+        return parts
+    return None
+
+
+def _collect(subjects, subject, found):
+    """
+    Append to `found` the handler sets in the `subjects` dictionary that
+    listen for the given `subject`, including those listening to every
+    subject via `WILDCARD`.
+    """
+    handlers = subjects.get(subject)
+    if handlers:
+        found.append(handlers)
+    handlers = subjects.get(WILDCARD)
+    if handlers:
+        found.append(handlers)
+
+
+def _match(node, parts, index, subject, found):
+    """
+    Walk the trie of channel patterns from `node`, matching the channel name
+    `parts` from `index` onwards, and collect handler sets for `subject` into
+    `found`.
+
+    Only branches matching the exact part, `WILDCARD` or `DEEP_WILDCARD` are
+    followed, so the cost is proportional to the depth of the channel name
+    rather than the number of subscriptions.
+    """
+    if index == len(parts):
+        _collect(node.subjects, subject, found)
+        return
+    children = node.children
+    child = children.get(parts[index])
+    if child:
+        _match(child, parts, index + 1, subject, found)
+    child = children.get(WILDCARD)
+    if child:
+        _match(child, parts, index + 1, subject, found)
+    child = children.get(DEEP_WILDCARD)
+    if child:
+        _collect(child.subjects, subject, found)
+
+
+def _found(channel, subject):
+    """
+    Return a list of the sets of handler entries listening for the `subject`
+    on the `channel`, whether via its exact name or a wildcard pattern.
+    """
+    found = []
+    subjects = _channels.get(channel)
+    if subjects:
+        _collect(subjects, subject, found)
+    if _patterns.children:
+        _match(_patterns, channel.split(SEPARATOR), 0, subject, found)
+    return found
+
+
+def _snapshot_for(channel, subject):
+    """
+    Return the snapshot of handlers to call when a message with the given
+    `subject` is published to the `channel`, building it if needed.
+    """
+    key = (channel, subject)
+    snapshot = _snapshots.get(key)
+    if snapshot is None:
+        snapshot = _snapshot(_found(channel, subject))
+        if len(_snapshots) >= MAX_CACHED_SNAPSHOTS:
+            _snapshots.clear()
+        _snapshots[key] = snapshot
+    return snapshot
+
+
+def _union_for(channels, subject):
+    """
+    Return the snapshot of handlers to call when a message with the given
+    `subject` is published to every one of the `channels` (a tuple), with
+    each handler appearing only once.
+
+    The result is remembered until subscriptions change, so publishing the
+    same sort of message to the same group of channels again costs a single
+    dictionary lookup.
+    """
+    key = (channels, subject)
+    union = _unions.get(key)
+    if union is None:
+        found = []
+        for channel in channels:
+            found.extend(_found(channel, subject))
+        union = _snapshot(found)
+        if len(_unions) >= MAX_CACHED_UNIONS:
+            _unions.clear()
+        _unions[key] = union
+    return union
+
+
+def _snapshot(found):
+    """
+    Return a tuple describing the handlers in the `found` list of sets of
+    handler entries, to be called in turn when publishing.
+
+    Each item is an `(entry, weak, is_async)` tuple. The `entry` is the
+    handler, a weak reference to it (if `weak` is `True`) or a limiter. The
+    check for asynchronous handlers is made once, here, rather than for
+    every message. A handler matched by several subscriptions (e.g. both an
+    exact channel name and a wildcard pattern) appears only once. Entries,
+    rather than handlers, are kept so weak subscriptions stay weak.
+    """
+    result = []
+    seen = set()
+    for handlers in found:
+        for entry in handlers:
+            weak = isinstance(entry, _REF_TYPE)
+            handler = entry() if weak else entry
+            if handler is None or handler in seen:
+                continue
+            seen.add(handler)
+            result.append((entry, weak, iscoroutinefunction(handler)))
+    return tuple(result)
+
+
+def _changed():
+    """
+    Forget the snapshots of handlers, since subscriptions have changed.
+    """
+    _snapshots.clear()
+    _unions.clear()
+
+
+def _weak(handler, callback=None):
+    """
+    Return a weak reference to the `handler`, calling the optional
+    `callback` when the handler is garbage collected.
+
+    Bound methods need a `WeakMethod`, because a new bound method object is
+    made each time a method is looked up on an object. If weak references
+    are unavailable, or the handler can't be weakly referenced, the handler
+    itself is returned.
+    """
+    if weakref is None:
+        return handler
+    try:
+        if hasattr(handler, "__self__") and hasattr(handler, "__func__"):
+            return weakref.WeakMethod(handler, callback)
+        return weakref.ref(handler, callback)
+    except TypeError:
+        return handler
+
+
+def _on_collected(ref):
+    """
+    Count weakly referenced handlers that have been garbage collected, so
+    the next call to `subscribe` knows to `compact` the subscriptions.
+
+    This may be called at any moment by the garbage collector, so it must
+    not change the subscriptions itself.
+    """
+    global _collected
+    _collected += 1
+
+
+def _find(handlers, handler):
+    """
+    Return the entry in the set of `handlers` for the given `handler`,
+    whether it was subscribed strongly or weakly, or `None` if it isn't
+    there.
+    """
+    if handler in handlers:
+        return handler
+    ref = _weak(handler)
+    if ref is not handler and ref in handlers:
+        return ref
+    for entry in handlers:
+        if isinstance(entry, _Limiter) and entry.wraps(handler):
+            return entry
+    return None
+
+
+def _subjects_for(channel, create=False):
+    """
+    Return the dictionary mapping subjects to handlers for the given
+    `channel` name or pattern. If it doesn't exist, return `None` unless
+    `create` is set, in which case an empty dictionary is created and
+    returned.
+    """
+    parts = _pattern_parts(channel)
+    if parts is None:
+        if create and channel not in _channels:
+            _channels[channel] = {}
+        return _channels.get(channel)
+    node = _patterns
+    for part in parts:
+        child = node.children.get(part)
+        if child is None:
+            if not create:
+                return None
+            child = _Node()
+            node.children[part] = child
+        node = child
+    return node.subjects
+
+
+def _prune(channel):
+    """
+    Remove the now empty entries for the given `channel` name or pattern, so
+    unused channels don't accumulate over the lifetime of the application.
+    """
+    parts = _pattern_parts(channel)
+    if parts is None:
+        if not _channels.get(channel):
+            _channels.pop(channel, None)
+        return
+    path = [_patterns]
+    for part in parts:
+        path.append(path[-1].children[part])
+    for i in range(len(parts), 0, -1):
+        node = path[i]
+        if node.subjects or node.children:
+            break
+        del path[i - 1].children[parts[i - 1]]
+
+
+def subscribe(
+    handler,
+    to_channel,
+    when_subject,
+    weak=False,
+    replay=False,
+    throttle_ms=None,
+    debounce_ms=None,
+    leading=None,
+    trailing=None,
+):
     """
     Subscribe a callable event `handler` `to_channel`[s] to handle when a
     certain sort of message[s] is received (identified by `when_subject`).
@@ -63,54 +732,873 @@ def subscribe(handler, to_channel, when_subject):
     The `to_channel` and `when_subject` arguments can be either individual
     strings or a list of strings to indicate the channel[s] and message subjects.
 
+    Channel names may contain wildcards: `"*"` matches any single part of a
+    `/` separated channel name, and `"**"` (only as the last part) matches
+    every channel beneath it. A `when_subject` of `"*"` matches every subject.
+    However many subscriptions match a published message, the handler is
+    called once per channel to which the message is published.
+
+    If `weak` is `True`, the subscription doesn't keep the `handler` alive:
+    once nothing else refers to it (for example, a widget whose page has been
+    thrown away), it is garbage collected and the subscription quietly
+    disappears. Don't subscribe a `lambda` or other throwaway function
+    weakly, as it will vanish straight away. MicroPython has no weak
+    references, so there all subscriptions are strong.
+
+    If `replay` is `True`, the `handler` is immediately sent any retained
+    messages (see `publish`) matching the subscription, so it learns the
+    current state of things without waiting for the next change.
+
+    If `debounce_ms` is given, the `handler` is only called once messages
+    have stopped arriving for that many milliseconds, with the latest one.
+    If `throttle_ms` is given, the `handler` is called at most once every
+    that many milliseconds. The `leading` and `trailing` flags decide if the
+    handler is called at the start and/or the end of the wait (see
+    `debounce` and `throttle` for the defaults). These limits apply to the
+    subscription as a whole, across all its channels and subjects.
+
+    Raises a `ValueError` if `"**"` is used before the last part of a channel
+    name, or if both `debounce_ms` and `throttle_ms` are given.
+
     E.g.
 
     ```python
+    # Listen for clicks on two channels.
     subscribe(handler=my_handler, to_channel=["foo", "bar", ], when_subject="click")
+
+    # Listen for every change to any key in the datastore.
+    subscribe(handler=my_handler, to_channel="datastore:set", when_subject="*")
+
+    # Listen for readings from every sensor in the kitchen.
+    subscribe(handler=my_handler, to_channel="sensor/kitchen/**", when_subject="reading")
+
+    # Stop listening when my_widget is garbage collected.
+    subscribe(handler=my_widget.refresh, to_channel="foo", when_subject="click", weak=True)
+
+    # Hear the current status of a connection, and then any changes.
+    subscribe(handler=my_handler, to_channel="my_socket", when_subject="status", replay=True)
+
+    # Search once the user pauses typing for a quarter of a second.
+    subscribe(handler=search, to_channel="search_box", when_subject="keypress", debounce_ms=250)
+
+    # Update a chart no more than ten times a second while a slider moves.
+    subscribe(handler=redraw, to_channel="slider", when_subject="slide", throttle_ms=100)
     ```
     """
-    if isinstance(to_channel, str):
-        to_channel = [
-            to_channel,
-        ]
-    if isinstance(when_subject, str):
-        when_subject = [
-            when_subject,
-        ]
+    if throttle_ms is not None and debounce_ms is not None:
+        raise ValueError("Cannot both throttle and debounce a handler.")
+    if _collected:
+        compact()
+    entry = _weak(handler, _on_collected) if weak else handler
+    if debounce_ms is not None:
+        entry = debounce(
+            entry, debounce_ms, bool(leading), trailing is not False
+        )
+    elif throttle_ms is not None:
+        entry = throttle(
+            entry, throttle_ms, leading is not False, trailing is not False
+        )
+    to_channel = _as_list(to_channel)
+    when_subject = _as_list(when_subject)
+    if isinstance(entry, _Limiter):
+        # Subscribing again is harmless, so reuse the existing limiter.
+        entry = _limiter_for(handler, to_channel, when_subject) or entry
     for channel in to_channel:
-        if channel not in _channels:
-            _channels[channel] = {}
+        subjects = _subjects_for(channel, create=True)
+        for name in when_subject:
+            message_handlers = subjects.get(name, set())
+            message_handlers.add(entry)
+            subjects[name] = message_handlers
+    _changed()
+    if replay and _retained:
+        if isinstance(entry, _Limiter):
+            handler = entry
+        _replay(handler, to_channel, when_subject)
+
+
+def _limiter_for(handler, to_channel, when_subject):
+    """
+    Return the `_Limiter` already subscribed for the `handler` to any of the
+    given channels and subjects, or `None` if there isn't one.
+    """
+    for channel in to_channel:
+        subjects = _subjects_for(channel)
+        if not subjects:
+            continue
         for name in when_subject:
-            message_handlers = _channels[channel].get(name, set())
-            message_handlers.add(handler)
-            _channels[channel][name] = message_handlers
+            entry = _find(subjects.get(name, ()), handler)
+            if isinstance(entry, _Limiter):
+                return entry
+    return None
 
 
-def publish(message, to_channel):
+def _replay(handler, to_channel, when_subject):
+    """
+    Send the `handler` the retained messages matching the given channels
+    and subjects (either of which may contain wildcards), oldest first.
+    """
+    patterns = [(channel, _pattern_parts(channel)) for channel in to_channel]
+    for (channel, subject), (message, size) in list(_retained.items()):
+        if WILDCARD not in when_subject and subject not in when_subject:
+            continue
+        for pattern, parts in patterns:
+            if pattern == channel or (
+                parts is not None and _channel_matches(parts, channel)
+            ):
+                _deliver(handler, message)
+                break
+
+
+def _channel_matches(parts, channel):
+    """
+    Return `True` if the `channel` name matches the `parts` of a channel
+    pattern containing wildcards.
+    """
+    names = channel.split(SEPARATOR)
+    for i, part in enumerate(parts):
+        if part == DEEP_WILDCARD:
+            return len(names) > i
+        if i >= len(names) or (part != WILDCARD and part != names[i]):
+            return False
+    return len(names) == len(parts)
+
+
+def _dispatch(message, channel):
+    """
+    Call the handlers listening for the `message` on the `channel`.
+    """
+    snapshot = _snapshot_for(channel, message._subject)
+    if _stats is not None:
+        _record_publish(channel, len(snapshot))
+    _run(snapshot, message)
+
+
+def _run(snapshot, message):
+    """
+    Pass the `message` to each handler in the `snapshot` (see `_snapshot`),
+    skipping weakly referenced handlers that have gone.
+    """
+    for entry, weak, is_async in snapshot:
+        handler = entry() if weak else entry
+        if handler is None:
+            continue
+        if is_async:
+            _queue_for(handler).put(message)
+        else:
+            _call(handler, message)
+
+
+def _deliver(handler, message):
+    """
+    Pass the `message` to the `handler`: via its queue for asynchronous
+    handlers, otherwise by calling it.
+    """
+    if iscoroutinefunction(handler):
+        _queue_for(handler).put(message)
+    else:
+        _call(handler, message)
+
+
+def _call(handler, message):
+    """
+    Call the synchronous `handler` with the `message`, timing how long it
+    takes if statistics are being recorded.
+    """
+    if _stats is None or isinstance(handler, _Limiter):
+        # A limiter is timed when it calls the handler it wraps.
+        handler(message)
+        return
+    start = timer()
+    try:
+        handler(message)
+    finally:
+        _record_handler(handler, elapsed_ms(start))
+
+
+def publish(message, to_channel, retain=False, dedupe=False):
     """
     Publish a `message` `to_channel`[s].
 
     The `to_channel` can be either an individual string of the name of a channel
     or a list of strings of channel names to which to publish the `message`.
 
+    Usually a handler subscribed to several of the channels is called once
+    for each of them. If `dedupe` is `True`, the message is treated as a
+    single event sent to a group of channels, and each handler is called
+    only once. The handlers for each group of channels are remembered until
+    subscriptions change. Statistics count such a publish once, under the
+    channel names joined by commas.
+
+    If `retain` is `True`, the `message` is kept as the latest news for its
+    subject on each channel, and sent to handlers that later subscribe with
+    `replay=True`. Retained messages are forgotten, oldest first, when they
+    use more memory than allowed by `set_retain_limit`.
+
+    Messages to channels set to `coalesce` are held back and delivered when
+    the browser is next ready to draw the page.
+
     E.g.
 
     ```python
     publish(message=my_message, to_channel=["foo", "bar", ])
+
+    # Handlers listening to both channels are called only once.
+    publish(message=my_message, to_channel=["foo", "bar", ], dedupe=True)
+
+    # Late subscribers (with replay=True) will hear the player is ready.
+    publish(message=Message("status", ready=True), to_channel="player", retain=True)
+    ```
+    """
+    if _collected:
+        compact()
+    channels = _ready(message, _as_list(to_channel), retain)
+    if dedupe and len(channels) > 1:
+        channels = tuple(channels)
+        snapshot = _union_for(channels, message._subject)
+        if _stats is not None:
+            _record_publish(",".join(channels), len(snapshot))
+        _run(snapshot, message)
+        return
+    for channel in channels:
+        _dispatch(message, channel)
+
+
+def _ready(message, channels, retain):
+    """
+    Retain the `message` on the `channels` if asked, and hold it for those
+    being coalesced. Return a list of the channels to which the message
+    should be dispatched straight away.
+    """
+    result = []
+    for channel in channels:
+        if retain:
+            _retain(message, channel)
+        policy = _coalesced.get(channel)
+        if policy is None:
+            result.append(channel)
+        else:
+            _hold(message, channel, policy)
+    return result
+
+
+async def apublish(message, to_channel, retain=False, dedupe=False):
+    """
+    Publish a `message` `to_channel`[s], waiting for room in the queue of
+    any asynchronous handler whose `overflow` policy is `BLOCK`.
+
+    This slows a busy publisher down to the pace of its slowest handler,
+    rather than dropping messages. Otherwise it behaves like `publish`.
+
+    E.g.
+
+    ```python
+    async def forward(readings):
+        for reading in readings:
+            await apublish(Message("reading", value=reading), "log")
     ```
     """
-    if isinstance(to_channel, str):
-        to_channel = [
-            to_channel,
+    if _collected:
+        compact()
+    channels = _ready(message, _as_list(to_channel), retain)
+    if dedupe and len(channels) > 1:
+        channels = tuple(channels)
+        groups = [(",".join(channels), _union_for(channels, message._subject))]
+    else:
+        groups = [
+            (channel, _snapshot_for(channel, message._subject))
+            for channel in channels
         ]
-    for channel in to_channel:
-        channel_info = _channels.get(channel, {})
-        if message._subject in channel_info:
-            for handler in channel_info[message._subject]:
-                if iscoroutinefunction(handler):
-                    asyncio.create_task(handler(message))
-                else:
-                    handler(message)
+    for name, snapshot in groups:
+        if _stats is not None:
+            _record_publish(name, len(snapshot))
+        for entry, weak, is_async in snapshot:
+            handler = entry() if weak else entry
+            if handler is None:
+                continue
+            if is_async:
+                queue = _queue_for(handler)
+                await queue.wait_for_space()
+                queue.put(message)
+            else:
+                _call(handler, message)
+
+
+def configure_queue(
+    handler,
+    max_size=DEFAULT_QUEUE_SIZE,
+    concurrency=1,
+    overflow=DROP_OLDEST,
+):
+    """
+    Configure the queue of messages waiting for the asynchronous `handler`.
+
+    The `max_size` is the most messages that may wait in the queue. The
+    `concurrency` is how many messages the handler works on at the same time:
+    with the default of `1`, messages are handled one after the other, in the
+    order they were published. The `overflow` policy decides what happens when
+    a message arrives and the queue is full:
+
+    * `DROP_OLDEST` (the default) - the oldest waiting message is dropped to
+      make room, which suits handlers that only care about recent news.
+    * `DROP_NEWEST` - the new message is dropped.
+    * `BLOCK` - `apublish` waits until there is room. Messages sent via
+      `publish`, which cannot wait, are dropped.
+
+    Raises a `ValueError` for an unknown `overflow` policy, or if `max_size`
+    or `concurrency` are less than one.
+
+    E.g.
+
+    ```python
+    async def save(message):
+        ...
+
+    # Save at most four things at once, and keep up to 50 waiting.
+    configure_queue(save, max_size=50, concurrency=4)
+
+    # Never lose a message: publishers wait for room via apublish.
+    configure_queue(save, overflow=BLOCK)
+    ```
+    """
+    if overflow not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+        raise ValueError(f"Unknown overflow policy: {overflow}")
+    if max_size < 1 or concurrency < 1:
+        raise ValueError("Queue size and concurrency must be at least 1.")
+    _queue_settings[handler] = {
+        "max_size": max_size,
+        "concurrency": concurrency,
+        "overflow": overflow,
+    }
+    queue = _queues.get(handler)
+    if queue:
+        queue.max_size = max_size
+        queue.concurrency = concurrency
+        queue.overflow = overflow
+
+
+def queue_stats():
+    """
+    Return a dictionary describing how busy the queues of asynchronous
+    handlers are.
+
+    The `"queues"` key holds a dictionary for each handler with work in
+    progress, keyed by the handler's name, showing how many messages are
+    waiting (`"depth"`), being handled right now (`"running"`), have been
+    handled (`"processed"`) and have been dropped (`"dropped"`). The
+    `"processed"` and `"dropped"` keys hold totals across all queues, past
+    and present.
+    """
+    result = {
+        "queues": {},
+        "processed": _queue_totals["processed"],
+        "dropped": _queue_totals["dropped"],
+    }
+    for handler, queue in _queues.items():
+        result["queues"][_handler_name(handler)] = {
+            "depth": len(queue.messages),
+            "running": queue.running,
+            "processed": queue.processed,
+            "dropped": queue.dropped,
+        }
+        result["processed"] += queue.processed
+        result["dropped"] += queue.dropped
+    return result
+
+
+def _queue_for(handler):
+    """
+    Return the queue for the asynchronous `handler`, creating it if needed.
+    """
+    queue = _queues.get(handler)
+    if queue is None:
+        queue = _Queue(handler, **_queue_settings.get(handler, {}))
+        _queues[handler] = queue
+    return queue
+
+
+def _retire_queue(queue):
+    """
+    Forget an idle `queue`, keeping a tally of its work, so handlers that
+    are no longer used don't linger in memory.
+    """
+    if _queues.get(queue.handler) is queue:
+        del _queues[queue.handler]
+    _queue_totals["processed"] += queue.processed
+    _queue_totals["dropped"] += queue.dropped
+
+
+def _handler_name(handler):
+    """
+    Return a human friendly name for the `handler`.
+    """
+    return getattr(handler, "__name__", None) or repr(handler)
+
+
+def enable_stats(slow_handler_ms=DEFAULT_SLOW_HANDLER_MS):
+    """
+    Start recording statistics about channels and handlers, to help find
+    busy channels and slow handlers (for instance, the ones making an app
+    feel sluggish). Read the numbers via `stats`.
+
+    Any handler taking longer than `slow_handler_ms` milliseconds is counted
+    as slow and reported in the browser's console. Calling this function
+    again changes `slow_handler_ms` but keeps the numbers recorded so far.
+
+    Recording costs a little time on every publish, so it is off until
+    asked for.
+
+    E.g.
+
+    ```python
+    # Report handlers that take longer than a frame.
+    enable_stats()
+
+    # Report handlers that take longer than 5 milliseconds.
+    enable_stats(slow_handler_ms=5)
+    ```
+    """
+    global _stats
+    if _stats is None:
+        _stats = {"channels": {}, "handlers": {}}
+    _stats["slow_handler_ms"] = slow_handler_ms
+
+
+def disable_stats():
+    """
+    Stop recording statistics and forget those recorded so far.
+    """
+    global _stats
+    _stats = None
+
+
+def reset_stats():
+    """
+    Forget the statistics recorded so far, but carry on recording.
+    """
+    if _stats is not None:
+        _stats["channels"] = {}
+        _stats["handlers"] = {}
+
+
+def stats():
+    """
+    Return a dictionary of statistics about channels and handlers.
+
+    The `"subscribers"` key holds, for every channel (or wildcard pattern)
+    with subscriptions, a dictionary of how many handlers listen for each
+    subject. This is always available.
+
+    Once `enable_stats` has been called, there are also:
+
+    * `"channels"` - for each channel that received messages, how many were
+      `"published"`, how many handlers were called in total (`"delivered"`)
+      and the most handlers called for a single message (`"max_fan_out"`).
+    * `"handlers"` - for each handler (by name), how many times it was
+      `"called"`, its `"total_ms"` and `"max_ms"` running times, how many
+      times it was `"slow"`, and a `"histogram"` of how long it took. The
+      histogram's `"counts"` line up with `HISTOGRAM_BUCKETS`, with one extra
+      count at the end for anything slower.
+    * `"slow_handler_ms"` - the time after which a handler counts as slow.
+    * `"queues"` - the result of `queue_stats`.
+
+    Asynchronous handlers are timed from start to finish, including any time
+    spent waiting on `await`.
+    """
+    result = {"subscribers": _subscriber_counts()}
+    if _stats is not None:
+        result["channels"] = {
+            name: dict(info) for name, info in _stats["channels"].items()
+        }
+        result["handlers"] = {}
+        for name, info in _stats["handlers"].items():
+            info = dict(info)
+            info["histogram"] = {
+                "buckets": list(HISTOGRAM_BUCKETS),
+                "counts": list(info["histogram"]),
+            }
+            result["handlers"][name] = info
+        result["slow_handler_ms"] = _stats["slow_handler_ms"]
+        result["queues"] = queue_stats()
+    return result
+
+
+def stats_json():
+    """
+    Return the result of `stats` as a JSON string, ready to be logged or
+    sent elsewhere for analysis.
+    """
+    return json.dumps(stats())
+
+
+def _subscriber_counts():
+    """
+    Return a dictionary of channel names (or patterns) mapped to dictionaries
+    of how many handlers listen for each subject.
+    """
+    result = {}
+    for channel, subjects in _channels.items():
+        result[channel] = {name: len(h) for name, h in subjects.items()}
+    nodes = [("", _patterns)]
+    while nodes:
+        prefix, node = nodes.pop()
+        if node.subjects:
+            result[prefix] = {
+                name: len(h) for name, h in node.subjects.items()
+            }
+        for part, child in node.children.items():
+            name = prefix + SEPARATOR + part if prefix else part
+            nodes.append((name, child))
+    return result
+
+
+def _record_publish(channel, fan_out):
+    """
+    Record that a message was published to the `channel`, and delivered to
+    `fan_out` handlers.
+    """
+    info = _stats["channels"].get(channel)
+    if info is None:
+        info = {"published": 0, "delivered": 0, "max_fan_out": 0}
+        _stats["channels"][channel] = info
+    info["published"] += 1
+    info["delivered"] += fan_out
+    if fan_out > info["max_fan_out"]:
+        info["max_fan_out"] = fan_out
+
+
+def _record_handler(handler, duration):
+    """
+    Record that the `handler` took `duration` milliseconds, warning in the
+    browser's console if it was slow.
+
+    Handlers are grouped by their qualified name (where the interpreter has
+    one), so the numbers point at the code responsible without keeping the
+    handler alive.
+    """
+    if _stats is None:
+        # Recording stopped while the handler was running.
+        return
+    name = getattr(handler, "__qualname__", None) or _handler_name(handler)
+    info = _stats["handlers"].get(name)
+    if info is None:
+        info = {
+            "called": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "slow": 0,
+            "histogram": [0] * (len(HISTOGRAM_BUCKETS) + 1),
+        }
+        _stats["handlers"][name] = info
+    info["called"] += 1
+    info["total_ms"] += duration
+    if duration > info["max_ms"]:
+        info["max_ms"] = duration
+    bucket = 0
+    for bound in HISTOGRAM_BUCKETS:
+        if duration <= bound:
+            break
+        bucket += 1
+    info["histogram"][bucket] += 1
+    if duration > _stats["slow_handler_ms"]:
+        info["slow"] += 1
+        window.console.warn(
+            f"Slow handler {name} took {duration:.1f}ms "
+            f"(budget {_stats['slow_handler_ms']}ms)."
+        )
+
+
+def set_retain_limit(max_bytes=DEFAULT_RETAIN_LIMIT):
+    """
+    Set the most memory, in `max_bytes`, that retained messages may use.
+
+    The size of each message is estimated from the length of its text
+    representation (see `Message.__str__`). The oldest retained messages are
+    forgotten first to make room, and a message that is bigger than the
+    limit on its own is not retained at all.
+    """
+    global _retain_limit
+    _retain_limit = max_bytes
+    _trim_retained()
+
+
+def clear_retained(channel=None, subject=None):
+    """
+    Forget retained messages for the given `channel` and `subject`. If the
+    `subject` isn't given, forget every retained message on the `channel`.
+    If neither is given, forget every retained message.
+    """
+    global _retained_size
+    for key in list(_retained):
+        if channel is not None and key[0] != channel:
+            continue
+        if subject is not None and key[1] != subject:
+            continue
+        _retained_size -= _retained.pop(key)[1]
+
+
+def _retain(message, channel):
+    """
+    Keep the `message` as the latest for its subject on the `channel`.
+    """
+    global _retained_size
+    key = (channel, message._subject)
+    old = _retained.pop(key, None)
+    if old is not None:
+        _retained_size -= old[1]
+    size = len(str(message))
+    if size > _retain_limit:
+        return
+    _retained[key] = (message, size)
+    _retained_size += size
+    _trim_retained()
+
+
+def _trim_retained():
+    """
+    Forget the oldest retained messages until they fit within the limit.
+    """
+    global _retained_size
+    while _retained and _retained_size > _retain_limit:
+        key = next(iter(_retained))
+        _retained_size -= _retained.pop(key)[1]
+
+
+def coalesce(channel, policy=LATEST):
+    """
+    Gather together messages published to the named `channel` and deliver
+    them to handlers once per frame drawn by the browser (usually about 60
+    times a second), rather than as soon as each message is published.
+
+    This helps with channels that receive many messages in quick succession,
+    such as readings from a sensor, where handlers would otherwise update the
+    page far more often than anyone could see.
+
+    The `policy` decides what handlers receive for each subject:
+
+    * `LATEST` (the default) - only the most recent message is delivered and
+      earlier ones are dropped.
+    * `ACCUMULATE` - a single message with the same subject is delivered, and
+      its `messages` attribute is a list of every message published since the
+      last delivery, oldest first.
+
+    Pass a `policy` of `None` to stop coalescing, delivering anything waiting
+    straight away. Messages are delivered via the browser's
+    `requestAnimationFrame`, or every `FLUSH_INTERVAL` milliseconds where that
+    isn't available. A `ValueError` is raised for an unknown `policy`.
+
+    E.g.
+
+    ```python
+    # A label showing a reading only needs to see the latest value.
+    coalesce("thermometer")
+
+    # A chart plotting every reading needs all of them.
+    coalesce("seismometer", policy=ACCUMULATE)
+
+    # Back to delivering every message as soon as it is published.
+    coalesce("thermometer", policy=None)
+    ```
+    """
+    if policy is None:
+        _coalesced.pop(channel, None)
+        _flush_channel(channel)
+    elif policy in (LATEST, ACCUMULATE):
+        _coalesced[channel] = policy
+    else:
+        raise ValueError(f"Unknown coalescing policy: {policy}")
+
+
+def _hold(message, channel, policy):
+    """
+    Keep the `message` for the `channel` until the next flush, according to
+    the coalescing `policy`.
+    """
+    waiting = _pending.get(channel)
+    if waiting is None:
+        waiting = collections.OrderedDict()
+        _pending[channel] = waiting
+    subject = message._subject
+    if policy == LATEST:
+        # Re-insert so the delivery order reflects the latest publication.
+        waiting.pop(subject, None)
+        waiting[subject] = message
+    else:
+        if subject in waiting:
+            waiting[subject].append(message)
+        else:
+            waiting[subject] = [message]
+    _schedule_flush()
+
+
+def _schedule_flush():
+    """
+    Ask the browser to flush pending messages before it next draws the page,
+    unless a flush has already been requested.
+
+    Falls back to a timer if `requestAnimationFrame` is unavailable (for
+    instance, in a web worker).
+    """
+    global _flush_scheduled
+    if _flush_scheduled:
+        return
+    _flush_scheduled = True
+    request_frame = getattr(window, "requestAnimationFrame", None)
+    if request_frame:
+        request_frame(_flush_proxy)
+    else:
+        window.setTimeout(_flush_proxy, FLUSH_INTERVAL)
+
+
+def _flush_channel(channel):
+    """
+    Deliver the messages waiting for the named `channel`.
+    """
+    waiting = _pending.pop(channel, None)
+    if not waiting:
+        return
+    for subject, held in waiting.items():
+        if isinstance(held, list):
+            held = Message(subject, messages=held)
+        _dispatch(held, channel)
+
+
+def flush(*args):
+    """
+    Deliver all messages waiting on coalesced channels straight away, rather
+    than waiting for the browser to draw the next frame.
+
+    Any arguments are ignored (the browser passes a timestamp when calling
+    this function before drawing a frame).
+    """
+    global _flush_scheduled
+    _flush_scheduled = False
+    # Messages published by handlers during the flush wait for the next one.
+    for channel in list(_pending):
+        _flush_channel(channel)
+
+
+# A single proxy, created once, for the browser to call when flushing.
+_flush_proxy = create_proxy(flush)
+
+
+def debounce(handler, wait_ms, leading=False, trailing=True):
+    """
+    Return a callable that passes its single argument to the `handler` once
+    it has stopped being called for `wait_ms` milliseconds. Each call
+    restarts the wait, and the `handler` receives the latest argument.
+
+    If `leading` is `True`, the `handler` is also called with the first
+    argument straight away. If `trailing` is `False`, it isn't called at the
+    end of the wait. Raises a `ValueError` if `wait_ms` isn't positive, or if
+    both `leading` and `trailing` are `False`.
+
+    E.g.
+
+    ```python
+    # Save once the user has stopped typing for half a second.
+    save_soon = debounce(save, 500)
+    save_soon(text)
+    ```
+    """
+    return _limit(handler, wait_ms, True, leading, trailing)
+
+
+def throttle(handler, wait_ms, leading=True, trailing=True):
+    """
+    Return a callable that passes its single argument to the `handler` at
+    most once every `wait_ms` milliseconds.
+
+    If `leading` is `True` (the default), the first call reaches the
+    `handler` straight away. If `trailing` is `True` (the default), the
+    latest argument from calls made during the wait reaches the `handler`
+    once it has passed. Raises a `ValueError` if `wait_ms` isn't positive, or
+    if both `leading` and `trailing` are `False`.
+
+    E.g.
+
+    ```python
+    # Redraw at most ten times a second, however often the data changes.
+    redraw_soon = throttle(redraw, 100)
+    redraw_soon(data)
+    ```
+    """
+    return _limit(handler, wait_ms, False, leading, trailing)
+
+
+def _limit(handler, wait_ms, debounce, leading, trailing):
+    """
+    Check the arguments for `debounce` or `throttle`, and return a new
+    `_Limiter`.
+    """
+    if wait_ms <= 0:
+        raise ValueError(f"Wait must be positive: {wait_ms}")
+    if not (leading or trailing):
+        raise ValueError("At least one of leading or trailing must be set.")
+    return _Limiter(handler, wait_ms, debounce, leading, trailing)
+
+
+def _now():
+    """
+    Return the browser's clock in milliseconds (the same clock used by its
+    timers).
+    """
+    return window.performance.now()
+
+
+def _schedule(limiter):
+    """
+    Add the `limiter` to the shared timer's heap for its deadline, unless it
+    is already there.
+    """
+    global _limiter_count
+    if limiter.scheduled:
+        return
+    limiter.scheduled = True
+    _limiter_count += 1
+    heapq.heappush(_limiters, (limiter.deadline, _limiter_count, limiter))
+    _arm()
+
+
+def _arm():
+    """
+    Make sure the shared timer goes off in time for the earliest deadline.
+    """
+    global _timer_handle, _timer_due
+    if not _limiters:
+        return
+    due = _limiters[0][0]
+    if _timer_handle is not None:
+        if _timer_due <= due:
+            return
+        window.clearTimeout(_timer_handle)
+    _timer_due = due
+    _timer_handle = window.setTimeout(_tick_proxy, max(0, due - _now()))
+
+
+def _tick(*args):
+    """
+    Called by the shared timer to deal with limiters whose deadlines have
+    passed. Exceptions raised by handlers are reported to the browser's
+    console, so the other limiters are still dealt with.
+    """
+    global _timer_handle
+    _timer_handle = None
+    now = _now()
+    while _limiters and _limiters[0][0] <= now:
+        limiter = heapq.heappop(_limiters)[2]
+        limiter.scheduled = False
+        try:
+            limiter.expire(now)
+        except Exception as ex:
+            window.console.error(
+                f"Error in handler {_handler_name(limiter._resolve())}: {ex}"
+            )
+    _arm()
+
+
+# A single proxy, created once, for the browser to call when the shared
+# timer goes off.
+_tick_proxy = create_proxy(_tick)
 
 
 def unsubscribe(handler, from_channel, when_subject):
@@ -120,6 +1608,7 @@ def unsubscribe(handler, from_channel, when_subject):
 
     The `from_channel` and `when_subject` arguments can be either individual
     strings or a list of strings to indicate the channel[s] and message subjects.
+    Wildcard channels and subjects must match those given when subscribing.
 
     E.g.
 
@@ -127,26 +1616,112 @@ def unsubscribe(handler, from_channel, when_subject):
     unsubscribe(handler=a_handler, from_channel=["foo", "bar", ], when_subject="click")
     ```
     """
-    if isinstance(from_channel, str):
-        from_channel = [
-            from_channel,
-        ]
-    if isinstance(when_subject, str):
-        when_subject = [
-            when_subject,
-        ]
+    from_channel = _as_list(from_channel)
+    when_subject = _as_list(when_subject)
     for channel in from_channel:
-        channel_info = _channels.get(channel)
+        channel_info = _subjects_for(channel)
         if channel_info:
             for name in when_subject:
-                if name in channel_info and handler in channel_info[name]:
-                    channel_info[name].remove(handler)
+                entry = _find(channel_info.get(name, ()), handler)
+                if entry is not None:
+                    channel_info[name].remove(entry)
+                    if isinstance(entry, _Limiter):
+                        entry.cancel()
+                    if not channel_info[name]:
+                        del channel_info[name]
                 else:
                     raise ValueError(
                         f"Cannot unsubscribe from unknown message type: {name}"
                     )
-
+            _prune(channel)
+            _changed()
         else:
             raise ValueError(
                 f"Cannot unsubscribe from unknown channel: {channel}"
             )
+
+
+def has_subscribers(channel, subject):
+    """
+    Return `True` if any handler would receive a message with the given
+    `subject` published to the `channel` (including via wildcards).
+
+    This lets a publisher skip the work of making a message nobody is
+    listening for.
+    """
+    return bool(_snapshot_for(channel, subject))
+
+
+def compact():
+    """
+    Forget subscriptions whose weakly referenced handlers have been garbage
+    collected, along with any channels left with no subscriptions.
+
+    This happens automatically from time to time, so there is rarely any
+    need to call it.
+    """
+    global _collected
+    _collected = 0
+    _changed()
+    for channel in list(_channels):
+        _compact_subjects(_channels[channel])
+        if not _channels[channel]:
+            del _channels[channel]
+    _compact_node(_patterns)
+
+
+def _compact_subjects(subjects):
+    """
+    Remove dead weak references, and then empty subjects, from the
+    `subjects` dictionary.
+    """
+    for name in list(subjects):
+        handlers = subjects[name]
+        for handler in list(handlers):
+            if isinstance(handler, _REF_TYPE) and handler() is None:
+                handlers.discard(handler)
+            elif isinstance(handler, _Limiter) and handler.is_dead():
+                handlers.discard(handler)
+        if not handlers:
+            del subjects[name]
+
+
+def _compact_node(node):
+    """
+    Compact the trie of channel patterns from `node` downwards, removing
+    branches with no subscriptions.
+    """
+    _compact_subjects(node.subjects)
+    for part in list(node.children):
+        child = node.children[part]
+        _compact_node(child)
+        if not (child.subjects or child.children):
+            del node.children[part]
+
+
+def _reset():
+    """
+    Forget every subscription. Used to give each test a clean slate.
+    """
+    global _flush_scheduled, _collected, _stats
+    global _retained_size, _retain_limit, _timer_handle
+    _flush_scheduled = False
+    _collected = 0
+    _stats = None
+    _retained.clear()
+    _retained_size = 0
+    _retain_limit = DEFAULT_RETAIN_LIMIT
+    _channels.clear()
+    _changed()
+    _patterns.children.clear()
+    _patterns.subjects.clear()
+    _coalesced.clear()
+    _pending.clear()
+    _queues.clear()
+    _queue_settings.clear()
+    _queue_totals["processed"] = 0
+    _queue_totals["dropped"] = 0
+    if _timer_handle is not None:
+        window.clearTimeout(_timer_handle)
+        _timer_handle = None
+    _limiters.clear()
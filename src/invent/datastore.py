@@ -21,10 +21,205 @@ limitations under the License.
 ```
 """
 
+import asyncio
 import base64
+import collections
 import json
+import random
 from pyscript import Storage, window
-from .channels import Message, publish
+from pyscript.ffi import create_proxy
+from .channels import (
+    Message,
+    publish,
+    subscribe,
+    unsubscribe,
+    has_subscribers,
+)
+from .utils import is_micropython, timer, elapsed_ms
+
+try:
+    import zlib
+except ImportError:  # pragma: no cover
+    # MicroPython has the deflate module instead, which may or may not be
+    # able to compress, depending on how it was built.
+    import io
+
+    zlib = None
+    try:
+        import deflate
+    except ImportError:
+        deflate = None
+
+
+#: The default number of decoded values a `DataStore` keeps to hand.
+DEFAULT_CACHE_SIZE = 128
+
+#: The default number of items `iter_range` reads before letting other tasks
+#: run.
+DEFAULT_BATCH_SIZE = 100
+
+#: The default number of changes a `JournalBackend` records before
+#: compacting them into a snapshot.
+DEFAULT_COMPACT_EVERY = 500
+
+#: Marks a value stored in a backend as bytes, rather than JSON. JSON never
+#: starts with a NUL character.
+BINARY_TAG = "\x00b"
+
+#: Marks a value stored in a backend as compressed. Followed by one character
+#: per byte of the value, as usual, UTF-8 encoded and then zlib compressed.
+COMPRESSED_TAG = "\x00z"
+
+#: The default length (in characters) above which a `DataStore` compresses
+#: values.
+DEFAULT_COMPRESS_THRESHOLD = 4096
+
+#: Marks a value stored in a backend as one that expires. Followed by the
+#: time it expires (in milliseconds since the epoch), a NUL character, and
+#: then the value as usual.
+EXPIRY_TAG = "\x00e"
+
+#: The default name of the `BroadcastChannel` used to share changes between
+#: browser tabs.
+DEFAULT_SHARE_NAME = "invent-datastore"
+
+# The open instances of `_LocalBroadcastChannel`, keyed by name.
+_local_channels = {}
+
+# The keys in each namespace of the browser's localStorage, shared by all
+# instances of `LocalStorageBackend`. Keyed by namespace, and built when
+# first needed.
+_key_indexes = {}
+
+
+def _bytes_to_text(data):
+    """
+    Return a string with one character (in the range 0-255) for each byte of
+    the `data`, so bytes can be stored where only strings are allowed.
+
+    MicroPython only decodes UTF-8, so the characters are made one by one.
+    """
+    if is_micropython:  # pragma: no cover
+        return "".join([chr(b) for b in data])
+    return data.decode("latin-1")
+
+
+def _text_to_bytes(text):
+    """
+    Return the bytes represented by the `text` made by `_bytes_to_text`.
+    """
+    if is_micropython:  # pragma: no cover
+        return bytes([ord(c) for c in text])
+    return text.encode("latin-1")
+
+
+def _compress(data):
+    """
+    Return the `data` (bytes) compressed in the zlib format, or `None` if
+    compression isn't available.
+    """
+    if zlib is None:  # pragma: no cover
+        if deflate is None:
+            return None
+        stream = io.BytesIO()
+        try:
+            with deflate.DeflateIO(stream, deflate.ZLIB) as compressor:
+                compressor.write(data)
+        except Exception:
+            # Built without support for compression.
+            return None
+        return stream.getvalue()
+    return zlib.compress(data)
+
+
+def _decompress(data):
+    """
+    Return the `data` (bytes) made by `_compress`, decompressed.
+    """
+    if zlib is None:  # pragma: no cover
+        with deflate.DeflateIO(io.BytesIO(data), deflate.ZLIB) as stream:
+            return stream.read()
+    return zlib.decompress(data)
+
+
+def _now_ms():
+    """
+    Return the current time, in milliseconds since the epoch.
+    """
+    return window.Date.now()
+
+
+def _split_expiry(raw_value):
+    """
+    Return a tuple of the time the `raw_value` read from a backend expires
+    (or `None` if it doesn't) and the value without its `EXPIRY_TAG` prefix.
+    """
+    if not raw_value.startswith(EXPIRY_TAG):
+        return None, raw_value
+    end = raw_value.index("\x00", len(EXPIRY_TAG))
+    return int(raw_value[len(EXPIRY_TAG) : end]), raw_value[end + 1 :]
+
+
+def _with_expiry(raw_value, expires):
+    """
+    Return the `raw_value` prefixed so it `expires` at the given time (in
+    milliseconds since the epoch).
+    """
+    return f"{EXPIRY_TAG}{int(expires)}\x00{raw_value}"
+
+
+def _size(key, raw_value):
+    """
+    Return the approximate number of bytes an item takes in the browser's
+    storage. Both the `key` and the `raw_value` are stored as UTF-16.
+    """
+    return 2 * (len(key) + len(raw_value))
+
+
+def _to_base64(data):
+    """
+    Return the `data` (bytes) base64 encoded, as a string.
+    """
+    return base64.b64encode(data).decode("ascii")
+
+
+def _copy(value):
+    """
+    Return a copy of the `value`, and of any lists and dictionaries within
+    it.
+    """
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _apply_op(value, op):
+    """
+    Apply the patch operation `op` (see `DataStore.patch`) to the `value`, in
+    place. Raises a `ValueError` if the operation is unknown or doesn't fit
+    the `value`.
+    """
+    kind = op.get("op")
+    path = op.get("path", [])
+    try:
+        target = value
+        if kind == "append":
+            for part in path:
+                target = target[part]
+            target.append(op["value"])
+        elif kind in ("set", "remove") and path:
+            for part in path[:-1]:
+                target = target[part]
+            if kind == "set":
+                target[path[-1]] = op["value"]
+            else:
+                del target[path[-1]]
+        else:
+            raise ValueError(f"Unknown patch operation: {op}")
+    except (KeyError, IndexError, TypeError, AttributeError) as ex:
+        raise ValueError(f"Cannot apply patch operation {op}: {ex!r}")
 
 
 class DataBackend:
@@ -33,8 +228,23 @@ class DataBackend:
     mostly looks like a Python dictionary. The following methods must be
     implemented by any subclass: `clear`, `keys`, `sync`, `__setitem__`,
     `__getitem__`, and `__delitem__`.
+
+    The asynchronous bulk methods (`get_many`, `set_many`, `delete_many` and
+    `iter_range`) work on many items at once, and wait for the backend to
+    `sync` only once.
+
+    If `shared` is `True`, the items are stored somewhere all the browser's
+    tabs can see (such as `localStorage`), rather than by each tab.
+
+    If `stores_objects` is `True`, a `DataStore` gives the backend Python
+    values as they are, rather than serialized as strings.
     """
 
+    #: Whether all browser tabs see the same items.
+    shared = False
+    #: Whether the backend stores Python values rather than strings.
+    stores_objects = False
+
     def clear(self):
         """
         Clear data from the backend.
@@ -71,6 +281,56 @@ class DataBackend:
         """
         raise NotImplementedError
 
+    async def get_many(self, keys):
+        """
+        Return a dictionary of the values of the items with the given `keys`.
+        Keys that don't exist are left out.
+        """
+        result = {}
+        for key in keys:
+            try:
+                result[key] = self[key]
+            except KeyError:
+                pass
+        return result
+
+    async def set_many(self, items):
+        """
+        Set each key/value pair in the `items` dictionary, and then `sync`.
+        """
+        for key, value in items.items():
+            self[key] = value
+        await self.sync()
+
+    async def delete_many(self, keys):
+        """
+        Delete the items with the given `keys`, and then `sync`. Keys that
+        don't exist are ignored.
+        """
+        for key in keys:
+            if key in self:
+                del self[key]
+        await self.sync()
+
+    def iter_range(self, start=None, stop=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Return an asynchronous iterator over the `(key, value)` pairs of the
+        items whose keys are from `start` up to (but not including) `stop`,
+        in order. Either may be `None`, to leave the range open at that end.
+
+        Values are read in batches of `batch_size`, letting other tasks run
+        in between, so even a large store can be read without the page
+        freezing.
+
+        E.g.
+
+        ```python
+        async for key, value in datastore.iter_range("log-2025", "log-2026"):
+            print(key, value)
+        ```
+        """
+        return _RangeIterator(self, start, stop, batch_size)
+
     def pop(self, key, default=None):
         """
         Pop the specified `key` from the data store and return the associated
@@ -109,6 +369,44 @@ class DataBackend:
         """
         raise NotImplementedError()
 
+    def watch(self, callback):
+        """
+        Call `callback(key)` whenever the item with the given key is changed
+        from outside this backend (for instance, by another browser tab). A
+        `key` of `None` means any item may have changed.
+
+        By default, backends have no such outside changes, so nothing
+        happens.
+        """
+        return
+
+    def set_patched(self, key, value, ops):
+        """
+        Set the `value` against the given `key`, where the value is the
+        result of the given patch `ops` (see `DataStore.patch`). Backends
+        able to store only the `ops` can override this.
+        """
+        self[key] = value
+
+    def reload(self, key):
+        """
+        Notice the item with the given `key` may have been changed by another
+        browser tab. A `key` of `None` means any item may have changed. Only
+        matters for `shared` backends.
+        """
+        return
+
+    def update(self, *args, **kwargs):
+        """
+        For each key/value pair in the given dictionaries and `**kwargs`,
+        insert them into the data store.
+        """
+        for arg in args:
+            for key, value in arg.items():
+                self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
     def values(self):
         """
         Return a list of the values stored in the data store.
@@ -155,6 +453,170 @@ class DataBackend:
         return key in self.keys()
 
 
+class _RangeIterator:
+    """
+    The asynchronous iterator returned by `DataBackend.iter_range`.
+    """
+
+    def __init__(self, backend, start, stop, batch_size):
+        self.backend = backend
+        self.start = start
+        self.stop = stop
+        self.batch_size = batch_size
+        # The keys in the range, in order, gathered when iteration starts.
+        self.keys = None
+        self.position = 0
+        # The pairs read in the current batch, in reverse order.
+        self.batch = []
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.keys is None:
+            self.keys = sorted(
+                key
+                for key in self.backend.keys()
+                if (self.start is None or key >= self.start)
+                and (self.stop is None or key < self.stop)
+            )
+        while not self.batch:
+            if self.position >= len(self.keys):
+                raise StopAsyncIteration
+            if self.position:
+                # Let other tasks run between batches.
+                await asyncio.sleep(0)
+            end = self.position + self.batch_size
+            keys = self.keys[self.position : end]
+            self.position = end
+            values = await self.backend.get_many(keys)
+            # Items may have gone since the keys were gathered.
+            self.batch = [
+                (key, values[key]) for key in reversed(keys) if key in values
+            ]
+        return self.batch.pop()
+
+
+class MemoryBackend(DataBackend):
+    """
+    A key/value data store that keeps Python values in memory, for as long
+    as the page. Useful for tests, and for data that needn't persist.
+
+    A `DataStore` on this backend stores values as they are, so nothing is
+    serialized as JSON, compressed or decoded. Values are not copied, so
+    shouldn't be changed once set (as with values read from any data
+    store). If `validate` is `True`, values that couldn't be serialized as
+    JSON (and so couldn't be stored by other backends) are refused with a
+    `ValueError`.
+    """
+
+    stores_objects = True
+
+    def __init__(self, validate=False, **kwargs):
+        """
+        Any `**kwargs` are added to the dictionary.
+        """
+        self.validate = validate
+        self._items = {}
+        if kwargs:
+            self.update(kwargs)
+
+    def clear(self):
+        """
+        Removes all items from the data store.
+        """
+        self._items.clear()
+
+    def keys(self):
+        """
+        Returns a list of the keys of the items.
+        """
+        return list(self._items)
+
+    async def sync(self):
+        """
+        Nothing to synchronise.
+        """
+        return
+
+    def __getitem__(self, key):
+        """
+        Get the value stored against the given `key`.
+        """
+        return self._items[key]
+
+    def __setitem__(self, key, value):
+        """
+        Set the `value` against the given `key`.
+        """
+        self._items[key] = value
+
+    def __delitem__(self, key):
+        """
+        Delete the item stored against the given `key`.
+        """
+        del self._items[key]
+
+    def __contains__(self, key):
+        """
+        Checks if a `key` is in the datastore.
+        """
+        return key in self._items
+
+    def __len__(self):
+        """
+        The number of items in the data store.
+        """
+        return len(self._items)
+
+
+class _Expiring:
+    """
+    A value that expires, as stored by a backend that `stores_objects`.
+    """
+
+    def __init__(self, expires, value):
+        self.expires = expires
+        self.value = value
+
+
+class _MessageEvent:
+    """
+    Stands in for the browser's `MessageEvent`.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+
+class _LocalBroadcastChannel:
+    """
+    Stands in for the browser's `BroadcastChannel`, within this Python
+    process. Messages posted to one instance are delivered, straight away, to
+    the other open instances with the same name.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._listeners = []
+        _local_channels.setdefault(name, []).append(self)
+
+    def addEventListener(self, event_type, listener):
+        self._listeners.append(listener)
+
+    def postMessage(self, data):
+        event = _MessageEvent(data)
+        for channel in list(_local_channels.get(self.name, [])):
+            if channel is not self:
+                for listener in channel._listeners:
+                    listener(event)
+
+    def close(self):
+        channels = _local_channels.get(self.name, [])
+        if self in channels:
+            channels.remove(self)
+
+
 class _FakeStorage(dict):
     """
     A Python `dict` with some JavaScript method shims. This is used if
@@ -191,11 +653,20 @@ class LocalStorageBackend(DataBackend):
     and feels mostly like a Python `dict` but has the same characteristics
     as a JavaScript `localStorage` object.
 
+    Finding the keys in `localStorage` means asking the browser for each
+    key in turn, so the keys in the backend's namespace are gathered once
+    and then kept up to date as items are set and deleted (by this or other
+    backends in the page, or by other tabs). This makes checking for, and
+    counting, keys quick. Items changed in `localStorage` by other means
+    are noticed after `reload(None)`.
+
     For more information see:
 
     <https://developer.mozilla.org/en-US/docs/Web/API/Web_Storage_API>
     """
 
+    shared = True
+
     def __init__(self, **kwargs):
         """
         The underlying `Storage` object is an instance of `Window.localStorage`
@@ -206,11 +677,18 @@ class LocalStorageBackend(DataBackend):
         self.namespace = "invent-"
         try:
             self.store = window.localStorage
+            # Shared with other backends, since there is one localStorage.
+            self._indexes = _key_indexes
         except ImportError:  # pragma: no cover
             # If the browser's localStorage isn't available, fall back to a Python
             # dict based solution. Such a situation may arise in certain security
             # contexts or if the app is served inside an iFrame.
             self.store = _FakeStorage()
+            self._indexes = {}
+        # Callbacks for changes made by other tabs, and the proxy listening
+        # for them (created when first needed).
+        self._watchers = []
+        self._storage_proxy = None
         if kwargs:
             self.update(kwargs)
 
@@ -218,26 +696,94 @@ class LocalStorageBackend(DataBackend):
         """
         Removes all items from the data store.
         """
+        self._indexes.clear()
         return self.store.clear()
 
     def keys(self):
         """
         Returns a list of keys stored by the user.
         """
-        result = []
-        namespace_slice = len(self.namespace)
-        for i in range(0, self.store.length):
-            key = self.store.key(i)
-            if key.startswith(self.namespace):
-                real_key = key[namespace_slice:]
-                result.append(real_key)
-        return result
+        return list(self._index())
 
     async def sync(self):
         """
-        No need to sync `localStorage` as it's always up to date.
+        No need to sync `localStorage` as it's always up to date, and so are
+        the keys gathered from it.
         """
-        return
+        pass
+
+    def watch(self, callback):
+        """
+        Call `callback(key)` whenever another browser tab changes the item
+        with the given key (or with a `key` of `None` if it clears
+        `localStorage`). The browser announces such changes via `storage`
+        events, which are not sent to the tab making the change.
+        """
+        self._watchers.append(callback)
+        self._listen()
+
+    def _listen(self):
+        """
+        Listen for `storage` events from other tabs, unless already doing so.
+        """
+        if self._storage_proxy is None:
+            self._storage_proxy = create_proxy(self._on_storage)
+            window.addEventListener("storage", self._storage_proxy)
+
+    def _on_storage(self, event):
+        """
+        Handle a `storage` `event` from another tab by updating the keys and
+        telling the watchers which key in this backend's namespace has
+        changed.
+        """
+        key = event.key
+        if key is None:
+            # All of localStorage was cleared.
+            self._indexes.clear()
+        else:
+            if not key.startswith(self.namespace):
+                return
+            key = key[len(self.namespace) :]
+            keys = self._indexes.get(self.namespace)
+            if keys is not None:
+                if event.newValue is None:
+                    keys.discard(key)
+                else:
+                    keys.add(key)
+        for callback in self._watchers:
+            callback(key)
+
+    def _index(self):
+        """
+        Return the set of keys in this backend's namespace, gathering them
+        from `localStorage` if needed.
+        """
+        keys = self._indexes.get(self.namespace)
+        if keys is None:
+            keys = set()
+            namespace_slice = len(self.namespace)
+            for i in range(0, self.store.length):
+                key = self.store.key(i)
+                if key.startswith(self.namespace):
+                    keys.add(key[namespace_slice:])
+            self._indexes[self.namespace] = keys
+            self._listen()
+        return keys
+
+    def reload(self, key):
+        """
+        Notice the item with the given `key` may have been changed by another
+        browser tab, before the browser's `storage` event says so. If `key`
+        is `None`, gather all the keys afresh.
+        """
+        keys = self._indexes.get(self.namespace)
+        if key is None:
+            self._indexes.pop(self.namespace, None)
+        elif keys is not None:
+            if self.store.getItem(self._namespace_key(key)) is None:
+                keys.discard(key)
+            else:
+                keys.add(key)
 
     def _namespace_key(self, key):
         """
@@ -249,7 +795,7 @@ class LocalStorageBackend(DataBackend):
         """
         Get and JSON deserialize the item stored against the given `key`.
         """
-        if key in self:
+        if key in self._index():
             return self.store.getItem(self._namespace_key(key))
         else:
             raise KeyError(key)
@@ -258,18 +804,36 @@ class LocalStorageBackend(DataBackend):
         """
         Set the `value` (as a JSON string) against the given `key`.
         """
-        return self.store.setItem(self._namespace_key(key), value)
+        result = self.store.setItem(self._namespace_key(key), value)
+        keys = self._indexes.get(self.namespace)
+        if keys is not None:
+            keys.add(key)
+        return result
 
     def __delitem__(self, key):
         """
         Delete the item stored against the given `key`.
         """
-        if key in self:
+        keys = self._index()
+        if key in keys:
             result = self.store.removeItem(self._namespace_key(key))
+            keys.discard(key)
             return result
         else:
             raise KeyError(key)
 
+    def __contains__(self, key):
+        """
+        Checks if a `key` is in the datastore.
+        """
+        return key in self._index()
+
+    def __len__(self):
+        """
+        The number of items in the data store.
+        """
+        return len(self._index())
+
 
 class IndexDBBackend(Storage, DataBackend):
     """
@@ -280,6 +844,11 @@ class IndexDBBackend(Storage, DataBackend):
     Looks and feels mostly like a Python `dict` but has the same characteristics
     as a JavaScript `indexedDB` object.
 
+    All the items are read when the backend is created, and changes are
+    written to `indexedDB` when the backend is synchronised. So, to load or
+    save many items, use the bulk methods (such as `set_many`), which wait
+    to `sync` only once.
+
     For more information see:
 
     <https://developer.mozilla.org/en-US/docs/Web/API/IndexedDB_API>
@@ -288,6 +857,185 @@ class IndexDBBackend(Storage, DataBackend):
     ...
 
 
+class JournalBackend(DataBackend):
+    """
+    A key/value data store kept in memory, and persisted as a journal of
+    changes appended to a PyScript `Storage` object (i.e. `indexedDB`).
+
+    Each change is recorded as a small entry (a patch only records its
+    operations), rather than by rewriting whole values. Every
+    `compact_every` changes, the items are written as a single snapshot and
+    the entries are removed. When created, the backend recovers its items
+    from the snapshot plus any later entries, so only the changes made since
+    the last `sync` can be lost.
+
+    This suits apps that change their data very often, such as those logging
+    readings from a sensor.
+
+    E.g.
+
+    ```python
+    await invent.start_datastore(_backend=JournalBackend)
+    invent.datastore.patch(
+        "readings", [{"op": "append", "path": [], "value": reading}]
+    )
+    ```
+    """
+
+    #: The key of the snapshot in the underlying storage.
+    SNAPSHOT_KEY = "snapshot"
+    #: The prefix of the keys of the journal's entries, followed by their
+    #: sequence number.
+    ENTRY_PREFIX = "journal-"
+
+    def __init__(self, store, compact_every=DEFAULT_COMPACT_EVERY):
+        """
+        Recover the items from the `store` (a PyScript `Storage` object or
+        other `dict` like object), recording changes to it from now on and
+        compacting them every `compact_every` changes.
+        """
+        self.store = store
+        self.compact_every = compact_every
+        self._items = {}
+        # The sequence number of the latest entry, and of the latest entry
+        # included in the snapshot.
+        self._sequence = 0
+        self._snapshot_sequence = 0
+        self.recover()
+
+    def recover(self):
+        """
+        Rebuild the items from the snapshot and the entries that follow it,
+        removing any entries left over from an interrupted compaction.
+        """
+        store = self.store
+        self._items = {}
+        self._sequence = 0
+        if self.SNAPSHOT_KEY in store:
+            snapshot = json.loads(store[self.SNAPSHOT_KEY])
+            self._items = snapshot["items"]
+            self._sequence = snapshot["sequence"]
+        self._snapshot_sequence = self._sequence
+        prefix = self.ENTRY_PREFIX
+        for key in list(store.keys()):
+            if key.startswith(prefix):
+                if int(key[len(prefix) :]) <= self._snapshot_sequence:
+                    del store[key]
+        # Replay the entries in order, stopping at any gap.
+        while True:
+            key = f"{prefix}{self._sequence + 1}"
+            if key not in store:
+                break
+            self._replay(json.loads(store[key]))
+            self._sequence += 1
+
+    def _replay(self, entry):
+        """
+        Apply the change recorded in the journal `entry` to the items.
+        """
+        kind = entry[0]
+        if kind == "set":
+            self._items[entry[1]] = entry[2]
+        elif kind == "patch":
+            value = json.loads(self._items[entry[1]])
+            for op in entry[2]:
+                _apply_op(value, op)
+            self._items[entry[1]] = json.dumps(value)
+        elif kind == "delete":
+            self._items.pop(entry[1], None)
+
+    def _record(self, entry):
+        """
+        Append the `entry` to the journal, compacting it if it's long enough.
+        """
+        self._sequence += 1
+        self.store[f"{self.ENTRY_PREFIX}{self._sequence}"] = json.dumps(entry)
+        if self._sequence - self._snapshot_sequence >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """
+        Write all the items as a snapshot, and remove the journal's entries.
+        """
+        store = self.store
+        store[self.SNAPSHOT_KEY] = json.dumps(
+            {"sequence": self._sequence, "items": self._items}
+        )
+        for sequence in range(self._snapshot_sequence + 1, self._sequence + 1):
+            store.pop(f"{self.ENTRY_PREFIX}{sequence}", None)
+        self._snapshot_sequence = self._sequence
+
+    def journal_length(self):
+        """
+        Return the number of changes recorded since the last snapshot.
+        """
+        return self._sequence - self._snapshot_sequence
+
+    def clear(self):
+        """
+        Removes all items from the data store.
+        """
+        self._items.clear()
+        self.compact()
+
+    def keys(self):
+        """
+        Returns a list of the keys of the items.
+        """
+        return list(self._items)
+
+    async def sync(self):
+        """
+        Wait for the journal to be written to the underlying storage.
+        """
+        await self.store.sync()
+
+    def set_patched(self, key, value, ops):
+        """
+        Set the `value` against the given `key`, recording only the patch
+        `ops` in the journal, if the value is plain JSON.
+        """
+        previous = self._items.get(key)
+        if previous is None or "\x00" in (previous[:1], value[:1]):
+            # Compressed, expiring or binary, so can't be patched as JSON.
+            self[key] = value
+            return
+        self._items[key] = value
+        self._record(["patch", key, ops])
+
+    def __getitem__(self, key):
+        """
+        Get the item stored against the given `key`.
+        """
+        return self._items[key]
+
+    def __setitem__(self, key, value):
+        """
+        Set the `value` against the given `key`.
+        """
+        self._items[key] = value
+        self._record(["set", key, value])
+
+    def __delitem__(self, key):
+        """
+        Delete the item stored against the given `key`.
+        """
+        del self._items[key]
+        self._record(["delete", key])
+
+    def __contains__(self, key):
+        """
+        Checks if a `key` is in the datastore.
+        """
+        return key in self._items
+
+    def __len__(self):
+        """
+        The number of items in the data store.
+        """
+        return len(self._items)
+
+
 class DataStore(DataBackend):
     """
     A simple key/value data store for the Invent platform.
@@ -299,25 +1047,106 @@ class DataStore(DataBackend):
     The DataStore can sit on top of various data backends, that are also
     specified in this module, depending on the use case. If no backend is
     provided, a default `LocalStorageBackend` is used.
+
+    Backends store values as JSON strings. To avoid decoding the same value
+    again and again, the most recently read values are kept to hand (see
+    `cache_stats`), and forgotten when they change. Values read from the data
+    store should be treated as read-only: to change a value, set it again.
+
+    Many changes can be made together via a `transaction`, so they reach the
+    backend, and are announced, only once they are all done.
+
+    Values longer than a threshold are compressed (see `compression_stats`)
+    and decompressed when read.
+
+    Some keys can be `computed` from others, rather than stored. Records
+    can be kept in an indexed `collection`.
+
+    Changes can be `share`d with other browser tabs running the same app.
+
+    Items can be `set` to expire after a while, and the data store can be
+    given a quota (see `set_quota`) so the least recently used items are
+    evicted to make room for new ones, before the browser's own limit (about
+    5MB for `localStorage`) is reached.
     """
 
     #: Channel name to indicate a value has been set in the datastore.
     DATASTORE_SET_CHANNEL = "datastore:set"
     #: Channel name to indicate a value has been deleted from the datastore.
     DATASTORE_DELETE_CHANNEL = "datastore:delete"
-
-    def __init__(self, _backend=None, **kwargs):
+    #: Channel name to indicate a transaction has changed the datastore.
+    DATASTORE_COMMIT_CHANNEL = "datastore:commit"
+    #: Channel name to indicate a value has been evicted from the datastore.
+    DATASTORE_EVICT_CHANNEL = "datastore:evict"
+
+    def __init__(
+        self,
+        _backend=None,
+        _cache_size=DEFAULT_CACHE_SIZE,
+        _compress_threshold=DEFAULT_COMPRESS_THRESHOLD,
+        **kwargs,
+    ):
         """
         Create a new data store with the given  `_backend`. If no `_backend` is
         provided, a default `LocalStorageBackend` is used.
 
+        At most `_cache_size` decoded values are kept to hand, with the least
+        recently read forgotten first. A `_cache_size` of `0` turns this off.
+
+        Values longer than `_compress_threshold` characters (once serialized)
+        are compressed. A `_compress_threshold` of `None` turns this off.
+
         Any `**kwargs` are passed to the backend.
         """
+        # Decoded values, keyed by key, least recently read first.
+        self._cache = collections.OrderedDict()
+        self._cache_size = _cache_size
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._compress_threshold = _compress_threshold
+        # How well compression worked, keyed by key.
+        self._compression = {}
+        # Computed items, and collections, keyed by name.
+        self._computed = {}
+        self._collections = {}
+        # While a transaction's changes are announced, the computed items to
+        # update once they all have been. Otherwise `None`.
+        self._deferred = None
+        # The channel changes are shared with other tabs over (or `None`),
+        # this tab's name on it, and the proxy listening to it.
+        self._share_channel = None
+        self._share_proxy = None
+        self._origin = f"{random.getrandbits(32):08x}"
+        # The (version, origin) of the latest change to each shared item.
+        self._versions = {}
+        # Changes staged by the open transaction, keyed by key, in the order
+        # they were made. Values are (value, JSON string) tuples, or `None`
+        # for deleted items. `None` when no transaction is open.
+        self._staged = None
+        # The number of nested transactions open, and whether the outermost
+        # one announces its changes as a single message.
+        self._depth = 0
+        self._aggregate = False
+        # The time each item expires, for the items known to expire.
+        self._expiry = {}
+        # The maximum bytes the items may take, or `None` for no limit.
+        self._quota = None
+        # When tracked (see `_track`), the approximate bytes each item takes,
+        # their total, and the keys least recently used first.
+        self._sizes = None
+        self._used = 0
+        self._recency = None
         if _backend is None:
             _backend = LocalStorageBackend()
         else:
             _backend.update()
         self.backend = _backend
+        # Whether values are stored as they are, so there's nothing to
+        # decode or keep to hand.
+        self._objects = _backend.stores_objects
+        if self._objects:
+            self._cache_size = 0
+        self.backend.watch(self._on_outside_change)
         if kwargs:
             self.update(**kwargs)
 
@@ -325,28 +1154,409 @@ class DataStore(DataBackend):
         """
         Clear all data from the data store.
         """
+        self._cache.clear()
+        self._compression.clear()
+        self._forget()
         self.backend.clear()
+        self._broadcast(None, None)
+        self._stale(None)
+        self._changed(None)
 
     def keys(self):
         """
         Get the keys of the data store.
         """
-        return self.backend.keys()
+        keys = self.backend.keys()
+        staged = self._staged
+        if not staged:
+            return keys
+        result = [key for key in keys if staged.get(key, True) is not None]
+        present = set(keys)
+        for key, entry in staged.items():
+            if entry is not None and key not in present:
+                result.append(key)
+        return result
 
     async def sync(self):
         """
         Synchronise with the backend provider.
         """
+        self._cache.clear()
+        self._forget()
+        self._stale(None)
         await self.backend.sync()
 
+    def invalidate(self, key=None):
+        """
+        Forget the decoded value of the item with the given `key`, so it is
+        read from the backend next time. If `key` is `None`, forget all
+        decoded values. The `computed` items depending on what was forgotten
+        are computed afresh when next read.
+
+        This happens automatically when items are set or deleted via the
+        data store, or changed by another browser tab.
+        """
+        if key is None:
+            self._cache.clear()
+            self._forget()
+        else:
+            self._cache.pop(key, None)
+            self._expiry.pop(key, None)
+            if self._sizes is not None:
+                self._measure(key)
+        self._stale(key)
+        self._changed(key)
+
+    def _on_outside_change(self, key):
+        """
+        Handle a change made to the backend from outside this data store
+        (e.g. by another tab changing `localStorage`).
+
+        When sharing without a `BroadcastChannel`, the change is announced
+        as if it were made here.
+        """
+        self.invalidate(key)
+        if self._share_channel is None and self._share_proxy is not None:
+            self._announce_remote(key, key in self.backend)
+
+    def share(self, name=DEFAULT_SHARE_NAME, _channel_class=None):
+        """
+        Share changes with the data stores in other browser tabs (of the same
+        origin) sharing the same `name`.
+
+        Changes made in another tab are applied here, and published on the
+        usual channels, so reactive widgets stay up to date. Each change
+        carries a version number for its key, so out of date and repeated
+        changes are ignored.
+
+        Changes are sent via the browser's `BroadcastChannel`. If that isn't
+        available, a backend whose items are `shared` (such as
+        `LocalStorageBackend`) can still share changes via the browser's
+        `storage` events.
+        """
+        if self._objects:
+            raise ValueError("Cannot share changes to Python objects.")
+        self.unshare()
+        if _channel_class is None:
+            if hasattr(window, "BroadcastChannel"):
+                channel = window.BroadcastChannel.new(name)
+            else:  # pragma: no cover
+                channel = None
+        else:
+            channel = _channel_class(name)
+        self._share_proxy = create_proxy(self._on_broadcast)
+        if channel is not None:
+            channel.addEventListener("message", self._share_proxy)
+        elif not self.backend.shared:  # pragma: no cover
+            raise ValueError("Cannot share changes without BroadcastChannel.")
+        self._share_channel = channel
+
+    def unshare(self):
+        """
+        Stop sharing changes with other browser tabs.
+        """
+        if self._share_channel is not None:
+            self._share_channel.close()
+        self._share_channel = None
+        self._share_proxy = None
+
+    def _broadcast(self, key, raw_value):
+        """
+        Tell other tabs the item with the given `key` now has the `raw_value`
+        (or has been deleted, if `None`). A `key` of `None` means everything
+        was cleared.
+        """
+        if self._share_channel is None:
+            return
+        version = 0
+        if key is not None:
+            version = self._versions.get(key, (0, ""))[0] + 1
+            self._versions[key] = (version, self._origin)
+        self._share_channel.postMessage(
+            json.dumps(
+                {
+                    "key": key,
+                    "raw": raw_value,
+                    "version": version,
+                    "origin": self._origin,
+                }
+            )
+        )
+
+    def _on_broadcast(self, event):
+        """
+        Apply a change broadcast by another tab, unless it's out of date.
+        """
+        change = json.loads(event.data)
+        origin = change["origin"]
+        if origin == self._origin:
+            return
+        key = change["key"]
+        if key is None:
+            if self.backend.shared:
+                self.backend.reload(None)
+            else:
+                self.backend.clear()
+            self._cache.clear()
+            self._forget()
+            self._stale(None)
+            self._changed(None)
+            return
+        stamp = (change["version"], origin)
+        if stamp <= self._versions.get(key, (0, "")):
+            return
+        self._versions[key] = stamp
+        raw_value = change["raw"]
+        if self.backend.shared:
+            self.backend.reload(key)
+        elif raw_value is not None:
+            self.backend[key] = raw_value
+        elif key in self.backend:
+            del self.backend[key]
+        else:
+            return
+        self.invalidate(key)
+        self._announce_remote(key, raw_value is not None)
+
+    def _announce_remote(self, key, present):
+        """
+        Publish a change made in another tab to the item with the given
+        `key`, which is `present` unless it was deleted.
+        """
+        if key is None:
+            return
+        if not present:
+            publish(
+                Message(subject=key),
+                to_channel=self.DATASTORE_DELETE_CHANNEL,
+            )
+            return
+        try:
+            value = self[key]
+        except KeyError:
+            # Deleted, or expired, since.
+            return
+        publish(
+            Message(subject=key, value=value),
+            to_channel=self.DATASTORE_SET_CHANNEL,
+        )
+
+    def cache_stats(self):
+        """
+        Return a dictionary describing how well the cache of decoded values
+        is working: its current and maximum `size`, and the number of reads
+        that were `hits` (found in the cache) and `misses` (decoded from the
+        backend).
+        """
+        return {
+            "size": len(self._cache),
+            "max_size": self._cache_size,
+            "hits": self._cache_hits,
+            "misses": self._cache_misses,
+        }
+
+    def compression_stats(self, key=None):
+        """
+        Return a dictionary describing how well compression worked for the
+        value of the item with the given `key` (or `None` if the value was
+        too short to compress). If `key` is `None`, return such a dictionary
+        for every item measured, keyed by key.
+
+        Each dictionary contains the serialized `size` of the value, the
+        `stored_size` once compressed, their `ratio`, and the `compress_ms`
+        and `decompress_ms` times (the latter is `None` until the value is
+        read from the backend). Use these to tune the threshold.
+
+        Only values that compress to less than their serialized size are
+        stored compressed, but all values over the threshold are measured.
+        """
+        if key is None:
+            return {k: dict(v) for k, v in self._compression.items()}
+        stats = self._compression.get(key)
+        return dict(stats) if stats else None
+
+    def computed(self, name, fn, depends_on):
+        """
+        Define a computed item called `name`, whose value is the result of
+        `fn`, called with the values of the keys in `depends_on` (in that
+        order, with `None` for any missing key). Returns the name.
+
+        The result is kept until one of those values changes. Then, if
+        anything is subscribed to the item (such as a widget property bound
+        via `from_datastore`), it is computed once more and published like a
+        stored item. Otherwise, this waits until the item is next read.
+
+        Computed items are not stored in the backend, so are not in `keys`,
+        and can't be set or deleted. Define an item with the same name to
+        replace it.
+
+        E.g.
+
+        ```python
+        datastore.computed(
+            "total",
+            lambda prices, quantity: sum(prices) * quantity,
+            depends_on=["prices", "quantity"],
+        )
+        label = Label(text=from_datastore("total"))
+        ```
+        """
+        old = self._computed.pop(name, None)
+        if old:
+            old.detach()
+        item = _Computed(self, name, fn, depends_on)
+        item.attach()
+        self._computed[name] = item
+        return name
+
+    def collection(self, name, indexes=()):
+        """
+        Return the `Collection` of records called `name`, with an index on
+        each of the fields named in `indexes`.
+
+        E.g.
+
+        ```python
+        orders = datastore.collection("orders", indexes=["status", "total"])
+        orders.put("A1", {"status": "open", "total": 42})
+        open_orders = orders.find(status="open")
+        big_orders = orders.range("total", 100)
+        ```
+        """
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = Collection(self, name)
+            self._collections[name] = collection
+        for field in indexes:
+            collection.add_index(field)
+        return collection
+
+    def _refresh(self, item):
+        """
+        Compute the `item` afresh and publish it, if anything is subscribed
+        to it. During a commit, this waits until all the changes have been
+        announced.
+        """
+        if self._deferred is not None:
+            if item not in self._deferred:
+                self._deferred.append(item)
+            return
+        if has_subscribers(self.DATASTORE_SET_CHANNEL, item.name):
+            publish(
+                Message(subject=item.name, value=item.get()),
+                to_channel=self.DATASTORE_SET_CHANNEL,
+            )
+
+    def usage(self):
+        """
+        Return a dictionary describing the space taken by the items in the
+        data store (or rather, the namespace of its backend): the approximate
+        `bytes` used, the number of `keys`, and the `quota` (or `None`).
+        """
+        sizes = self._track()
+        return {"bytes": self._used, "keys": len(sizes), "quota": self._quota}
+
+    def set_quota(self, max_bytes=None):
+        """
+        Limit the items in the data store to about `max_bytes` (as measured
+        by `usage`), or remove the limit if `max_bytes` is `None`.
+
+        With a quota, setting an item first evicts expired items and then,
+        if more room is needed, the least recently used items. Should the
+        browser refuse to store an item anyway, more items are evicted until
+        it fits. Each evicted item is announced to the
+        `self.DATASTORE_EVICT_CHANNEL` channel with a `reason` of either
+        "expired" or "lru".
+
+        E.g.
+
+        ```python
+        # Keep well within the browser's limit of about 5MB.
+        datastore.set_quota(4 * 1024 * 1024)
+        ```
+        """
+        self._quota = max_bytes
+        if max_bytes is not None:
+            self._track()
+            self._make_room(None, 0)
+
+    def remove_expired(self):
+        """
+        Evict all the items that have expired, and return how many there were.
+
+        Expired items are otherwise evicted when next read, or when room is
+        needed.
+        """
+        now = _now_ms()
+        count = 0
+        for key in list(self.backend.keys()):
+            expires, _ = self._split(self.backend[key])
+            if expires is not None and expires <= now:
+                self._evict(key, "expired")
+                count += 1
+        return count
+
     def __getitem__(self, key):
         """
         Get the value stored against the given  `key`.
-        """
-        raw_value = self.backend[key]
+
+        Raises a `KeyError` if the item has expired (and evicts it).
+        """
+        if self._computed and key in self._computed:
+            return self._computed[key].get()
+        if self._staged and key in self._staged:
+            entry = self._staged[key]
+            if entry is None:
+                raise KeyError(key)
+            return self._decode(entry[1])
+        if self._recency is not None and key in self._recency:
+            self._recency.pop(key)
+            self._recency[key] = None
+        cache = self._cache
+        if key in cache:
+            if self._expiry and self._has_expired(key):
+                self._evict(key, "expired")
+                raise KeyError(key)
+            self._cache_hits += 1
+            # Move to the end, as the most recently read.
+            value = cache.pop(key)
+            cache[key] = value
+            return value
+        self._cache_misses += 1
+        expires, raw_value = self._split(self.backend[key])
+        if expires is not None:
+            self._expiry[key] = expires
+            if expires <= _now_ms():
+                self._evict(key, "expired")
+                raise KeyError(key)
+        value = self._decode(raw_value, key)
+        if self._cache_size:
+            if len(cache) >= self._cache_size:
+                cache.pop(next(iter(cache)))
+            cache[key] = value
+        return value
+
+    def _decode(self, raw_value, key=None):
+        """
+        Return the Python value represented by the `raw_value` string read
+        from the backend for the item with the given `key`.
+        """
+        if self._objects:
+            return self._split(raw_value)[1]
+        if raw_value.startswith(EXPIRY_TAG):
+            raw_value = _split_expiry(raw_value)[1]
+        if raw_value.startswith(COMPRESSED_TAG):
+            start = timer()
+            data = _text_to_bytes(raw_value[len(COMPRESSED_TAG) :])
+            raw_value = _decompress(data).decode("utf-8")
+            stats = self._compression.get(key)
+            if stats:
+                stats["decompress_ms"] = elapsed_ms(start)
+        if raw_value.startswith(BINARY_TAG):
+            return _text_to_bytes(raw_value[len(BINARY_TAG) :])
         value = json.loads(raw_value)
         if isinstance(value, dict) and "__bytearray__" in value:
-            # This is a base64 encoded bytearray, so decode it back to a bytearray.
+            # Bytes stored by earlier versions, base64 encoded in JSON.
             return base64.b64decode(value["__bytearray__"])
         return value
 
@@ -354,25 +1564,43 @@ class DataStore(DataBackend):
         """
         Set the `value` against the given `key`.
 
-        If the `value` is of type `bytes` or a `bytearray`, it is base64
-        encoded and wrapped in a dictionary to allow it to be JSON serialized.
-        This is because the underlying storage only stores values as strings.
+        The underlying storage only stores values as strings. Most values are
+        stored as JSON, but a `value` of type `bytes` or `bytearray` is stored
+        as `BINARY_TAG` followed by one character per byte (a third smaller,
+        and quicker, than base64). Such values are read back as `bytes`.
 
         Publishes a message whose type is the item's `key`, along with the new
-        `value`, to the `self.DATASTORE_SET_CHANNEL` channel.
-        """
-        stored_value = value
-        if isinstance(value, (bytes, bytearray)):
-            stored_value = {
-                "__bytearray__": base64.b64encode(value).decode("utf-8")
-            }
-        try:
-            stored_value = json.dumps(stored_value)
-        except TypeError as e:
-            raise ValueError(
-                f"Value for key '{key}' is not JSON serializable: {e}"
-            )
-        self.backend[key] = stored_value
+        `value`, to the `self.DATASTORE_SET_CHANNEL` channel. Within a
+        `transaction`, this happens when the transaction is committed.
+        """
+        self.set(key, value)
+
+    def set(self, key, value, ttl=None):
+        """
+        Set the `value` against the given `key`, as with `datastore[key] =
+        value`. If a `ttl` (time to live) is given, the item expires after
+        that many seconds: reading it then raises a `KeyError`, and it is
+        evicted.
+
+        E.g.
+
+        ```python
+        # Keep the weather forecast for ten minutes.
+        datastore.set("forecast", forecast, ttl=600)
+        ```
+        """
+        if self._computed and key in self._computed:
+            raise ValueError(f"Cannot set computed item: {key}")
+        stored_value = self._encode(key, value)
+        if ttl is not None:
+            stored_value = self._expiring(stored_value, _now_ms() + ttl * 1000)
+        if self._staged is not None:
+            # Re-insert so the order of changes reflects the latest one.
+            self._staged.pop(key, None)
+            self._staged[key] = (value, stored_value)
+            return
+        self._cache.pop(key, None)
+        self._write(key, stored_value)
         publish(
             Message(subject=key, value=value),
             to_channel=self.DATASTORE_SET_CHANNEL,
@@ -383,23 +1611,1000 @@ class DataStore(DataBackend):
         Delete the item stored against the given `key`.
 
         Publishes a message whose type is the item's `key`, to the
-        `self.DATASTORE_DELETE_CHANNEL` channel.
-        """
-        del self.backend[key]
+        `self.DATASTORE_DELETE_CHANNEL` channel. Within a `transaction`, this
+        happens when the transaction is committed.
+        """
+        if self._computed and key in self._computed:
+            raise ValueError(f"Cannot delete computed item: {key}")
+        if self._staged is not None:
+            if key not in self:
+                raise KeyError(key)
+            self._staged.pop(key, None)
+            self._staged[key] = None
+            return
+        self._erase(key)
         publish(
             Message(subject=key),
             to_channel=self.DATASTORE_DELETE_CHANNEL,
         )
 
+    def __len__(self):
+        """
+        The number of items in the data store.
+        """
+        if self._staged:
+            return len(self.keys())
+        return len(self.backend)
+
+    def __contains__(self, key):
+        """
+        Checks if a `key` is in the datastore.
+        """
+        if self._computed and key in self._computed:
+            return True
+        if self._staged and key in self._staged:
+            return self._staged[key] is not None
+        if self._expiry and self._has_expired(key):
+            return False
+        return key in self.backend
+
+    def get(self, key, default=None):
+        """
+        Return the value of the item with the specified `key`.
+
+        If the `key` does not exist, or the item has expired, return the
+        `default` value.
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, default=None):
+        """
+        Pop the specified `key` from the data store and return the associated
+        value. If the `key` does not exist, or the item has expired, return
+        the `default` value.
+        """
+        try:
+            result = self[key]
+        except KeyError:
+            return default
+        del self[key]
+        return result
+
+    def setdefault(self, key, value=None):
+        """
+        Returns the value of the item with the specified `key`.
+
+        If the `key` does not exist, or the item has expired, insert the
+        `key`, with the specified `value`.
+
+        Default `value` is `None`.
+        """
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = value
+            return value
+
+    def _encode(self, key, value):
+        """
+        Return the string to store in the backend for the `value` of the item
+        with the given `key`, compressed if long enough.
+
+        Raises a `ValueError` if the `value` can't be serialized.
+        """
+        if self._objects:
+            validate = getattr(self.backend, "validate", False)
+            if validate and not isinstance(value, (bytes, bytearray)):
+                try:
+                    json.dumps(value)
+                except TypeError as e:
+                    raise ValueError(
+                        f"Value for key '{key}' is not JSON serializable: {e}"
+                    )
+            return value
+        if isinstance(value, (bytes, bytearray)):
+            raw_value = BINARY_TAG + _bytes_to_text(value)
+        else:
+            try:
+                raw_value = json.dumps(value)
+            except TypeError as e:
+                raise ValueError(
+                    f"Value for key '{key}' is not JSON serializable: {e}"
+                )
+        threshold = self._compress_threshold
+        if threshold is None or len(raw_value) <= threshold:
+            self._compression.pop(key, None)
+            return raw_value
+        start = timer()
+        data = _compress(raw_value.encode("utf-8"))
+        if data is None:  # pragma: no cover
+            return raw_value
+        compressed = COMPRESSED_TAG + _bytes_to_text(data)
+        self._compression[key] = {
+            "size": len(raw_value),
+            "stored_size": len(compressed),
+            "ratio": len(compressed) / len(raw_value),
+            "compress_ms": elapsed_ms(start),
+            "decompress_ms": None,
+        }
+        if len(compressed) < len(raw_value):
+            return compressed
+        return raw_value
+
+    def patch(self, key, ops):
+        """
+        Change part of the value stored against the given `key`, via a list
+        of `ops` (operations) in the style of JSON Patch. Each operation is a
+        dictionary, with a `path` of keys and/or indexes into the value:
+
+        * `{"op": "set", "path": [...], "value": v}` - set the item at the
+          `path` to `v`.
+        * `{"op": "append", "path": [...], "value": v}` - append `v` to the
+          list at the `path` (an empty `path` means the value itself).
+        * `{"op": "remove", "path": [...]}` - remove the item at the `path`.
+
+        The new value is published, in the same way as setting it, but the
+        message also has the `ops`. This lets subscribers (such as widgets
+        with an `on_FOO_patched` method) update only what changed, rather
+        than starting from scratch.
+
+        Raises a `KeyError` if the `key` doesn't exist, or a `ValueError` if
+        an operation doesn't fit the value (in which case the stored value is
+        left as it was). Within a `transaction`, the patched value is staged
+        like any other. If the item expires, it still expires at the same
+        time.
+
+        E.g.
+
+        ```python
+        # Change one cell in a table, and add a row.
+        datastore.patch("table", [
+            {"op": "set", "path": [3, 1], "value": 42},
+            {"op": "append", "path": [], "value": ["New", 0]},
+        ])
+        ```
+        """
+        # The value read is the one stored (or kept to hand), so must be
+        # left as it was should an operation, the write or the transaction
+        # fail.
+        value = _copy(self[key])
+        for op in ops:
+            _apply_op(value, op)
+        stored_value = self._encode(key, value)
+        staged = self._staged
+        if staged and key in staged:
+            # The item may have been set, with or without a ttl, since.
+            expires = self._split(staged[key][1])[0]
+        else:
+            expires = self._expiry.get(key)
+        if expires is not None:
+            stored_value = self._expiring(stored_value, expires)
+        if self._staged is not None:
+            self._staged.pop(key, None)
+            self._staged[key] = (value, stored_value)
+            return
+        self._cache.pop(key, None)
+        self._write(key, stored_value, ops)
+        publish(
+            Message(subject=key, value=value, ops=ops),
+            to_channel=self.DATASTORE_SET_CHANNEL,
+        )
+
+    async def set_many(self, items):
+        """
+        Set each key/value pair in the `items` dictionary, as a single
+        `transaction`, and wait for the backend to `sync`.
+        """
+        async with self.transaction():
+            for key, value in items.items():
+                self[key] = value
+
+    async def delete_many(self, keys):
+        """
+        Delete the items with the given `keys`, as a single `transaction`,
+        and wait for the backend to `sync`. Keys that don't exist are
+        ignored.
+        """
+        async with self.transaction():
+            for key in keys:
+                if key in self:
+                    del self[key]
+
+    def export_stream(self):
+        """
+        Yield the items in the data store, one at a time, as lines of JSON
+        (newline delimited JSON, or NDJSON) to be read by `import_stream`.
+
+        Each line is an object with the item's `key` and either its `value`
+        or, for bytes, its `bytes` (base64 encoded). Items that expire also
+        have the time they `expires` (in milliseconds since the epoch).
+        Expired and `computed` items are left out.
+
+        Only one item is decoded at a time, and the values kept to hand are
+        left as they were, so even a large data store can be exported.
+
+        E.g.
+
+        ```python
+        with open("backup.ndjson", "w") as backup:
+            for line in datastore.export_stream():
+                backup.write(line)
+        ```
+        """
+        now = _now_ms()
+        for key in self.backend.keys():
+            try:
+                expires, raw_value = self._split(self.backend[key])
+            except KeyError:
+                # Deleted since the keys were gathered.
+                continue
+            if expires is not None and expires <= now:
+                continue
+            value = self._decode(raw_value, key)
+            if isinstance(value, (bytes, bytearray)):
+                item = {"key": key, "bytes": _to_base64(value)}
+            else:
+                item = {"key": key, "value": value}
+            if expires is not None:
+                item["expires"] = expires
+            yield json.dumps(item) + "\n"
+
+    async def import_stream(
+        self, lines, batch_size=DEFAULT_BATCH_SIZE, aggregate=False
+    ):
+        """
+        Set the items described by the `lines` of JSON made by
+        `export_stream` (any iterable of strings, such as an open file), and
+        return how many were set. Blank lines are ignored, and items that
+        have expired are left out.
+
+        The items are set `batch_size` at a time, each batch as a single
+        `transaction` (with `aggregate` announcements if `True`) that waits
+        for the backend to `sync`. So only one batch is held in memory at
+        once.
+
+        Raises a `ValueError` for a line that can't be read, after setting
+        the items before it.
+
+        E.g.
+
+        ```python
+        with open("backup.ndjson") as backup:
+            count = await datastore.import_stream(backup)
+        ```
+        """
+        count = 0
+        batch = []
+        number = 0
+        for line in lines:
+            number += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                key = item["key"]
+                if "bytes" in item:
+                    value = base64.b64decode(item["bytes"])
+                else:
+                    value = item["value"]
+            except (ValueError, KeyError, TypeError) as ex:
+                await self._import_batch(batch, aggregate)
+                raise ValueError(f"Cannot import line {number}: {ex!r}")
+            batch.append((key, value, item.get("expires")))
+            if len(batch) >= batch_size:
+                count += await self._import_batch(batch, aggregate)
+                batch = []
+        count += await self._import_batch(batch, aggregate)
+        return count
+
+    async def _import_batch(self, batch, aggregate):
+        """
+        Set the `(key, value, expires)` items in the `batch` as a single
+        transaction, and return how many were set.
+        """
+        if not batch:
+            return 0
+        count = 0
+        now = _now_ms()
+        async with self.transaction(aggregate):
+            for key, value, expires in batch:
+                if expires is None:
+                    self.set(key, value)
+                elif expires > now:
+                    self.set(key, value, ttl=(expires - now) / 1000)
+                else:
+                    continue
+                count += 1
+        return count
+
     def update(self, *args, **kwargs):
         """
         For each key/value pair in the iterable, insert them into the
-        data store.
+        data store, as a single `transaction`.
         """
         new_items = {}
         for arg in args:
             if isinstance(arg, dict):
                 new_items.update(arg)
         new_items.update(kwargs)
-        for key, value in new_items.items():
-            self[key] = value
+        with self.transaction():
+            for key, value in new_items.items():
+                self[key] = value
+
+    def transaction(self, aggregate=False):
+        """
+        Return a context manager (for use with `with` or `async with`) that
+        stages changes to the data store until the end of the block.
+
+        Within the block, reads see the staged changes, but nothing is
+        written to the backend or announced. At the end of the block, all
+        the changes are written to the backend in one go, and then
+        announced: once for each changed key (however many times it was
+        changed) or, if `aggregate` is `True`, as a single "commit" message
+        to the `self.DATASTORE_COMMIT_CHANNEL` channel with `changes` (a
+        dictionary of new values) and `deleted` (a list of keys).
+
+        If an exception is raised within the block, the staged changes are
+        thrown away. If the backend fails part way through writing them, the
+        changes already written are undone. A transaction opened within
+        another joins it. Using `async with` also waits for the backend to
+        `sync`.
+
+        E.g.
+
+        ```python
+        with datastore.transaction():
+            for row in rows:
+                datastore[row["id"]] = row
+
+        # Tell listeners about the import with a single message.
+        async with datastore.transaction(aggregate=True):
+            datastore.update(imported)
+        ```
+        """
+        return _Transaction(self, aggregate)
+
+    def _begin(self, aggregate):
+        """
+        Start (or join) a transaction.
+        """
+        if self._depth == 0:
+            self._staged = collections.OrderedDict()
+            self._aggregate = aggregate
+        self._depth += 1
+
+    def _end(self, commit):
+        """
+        End a transaction. Once the outermost transaction ends, `commit` its
+        staged changes or throw them away. Returns `True` if changes were
+        committed.
+        """
+        self._depth -= 1
+        if self._depth:
+            return False
+        staged = self._staged
+        self._staged = None
+        if commit and staged:
+            self._commit(staged)
+            return True
+        return False
+
+    def _commit(self, staged):
+        """
+        Write the `staged` changes to the backend, and announce them.
+        """
+        backend = self.backend
+        # (key, previous JSON string or None) for each change written.
+        written = []
+        try:
+            for key, entry in staged.items():
+                previous = backend[key] if key in backend else None
+                self._cache.pop(key, None)
+                if entry is None:
+                    if previous is not None:
+                        self._erase(key)
+                else:
+                    self._write(key, entry[1])
+                written.append((key, previous))
+        except Exception:
+            for key, previous in reversed(written):
+                if previous is None:
+                    backend.pop(key, None)
+                else:
+                    backend[key] = previous
+                self._expiry.pop(key, None)
+                self._broadcast(key, previous)
+                self._changed(key)
+            # Measure afresh, rather than undo the bookkeeping.
+            self._sizes = None
+            raise
+        # Computed items are updated once, after all the changes.
+        self._deferred = []
+        try:
+            self._announce(staged, written)
+        finally:
+            deferred = self._deferred
+            self._deferred = None
+        for item in deferred:
+            self._refresh(item)
+
+    def _announce(self, staged, written):
+        """
+        Announce the `staged` changes that were `written` by `_commit`.
+        """
+        if self._aggregate:
+            changes = {}
+            deleted = []
+            for key, previous in written:
+                entry = staged[key]
+                if entry is not None:
+                    changes[key] = entry[0]
+                elif previous is not None:
+                    deleted.append(key)
+            publish(
+                Message(subject="commit", changes=changes, deleted=deleted),
+                to_channel=self.DATASTORE_COMMIT_CHANNEL,
+            )
+            return
+        for key, previous in written:
+            entry = staged[key]
+            if entry is not None:
+                publish(
+                    Message(subject=key, value=entry[0]),
+                    to_channel=self.DATASTORE_SET_CHANNEL,
+                )
+            elif previous is not None:
+                publish(
+                    Message(subject=key),
+                    to_channel=self.DATASTORE_DELETE_CHANNEL,
+                )
+
+    def _split(self, raw_value):
+        """
+        Return a tuple of the time the `raw_value` read from the backend
+        expires (or `None` if it doesn't) and the value without its expiry.
+        """
+        if self._objects:
+            if isinstance(raw_value, _Expiring):
+                return raw_value.expires, raw_value.value
+            return None, raw_value
+        return _split_expiry(raw_value)
+
+    def _expiring(self, raw_value, expires):
+        """
+        Return the `raw_value` to store so it `expires` at the given time.
+        """
+        if self._objects:
+            return _Expiring(int(expires), raw_value)
+        return _with_expiry(raw_value, expires)
+
+    def _size(self, key, raw_value):
+        """
+        Return the approximate number of bytes the item takes.
+        """
+        if self._objects:
+            # Python values have no length as such, so use their repr.
+            return _size(key, repr(self._split(raw_value)[1]))
+        return _size(key, raw_value)
+
+    def _has_expired(self, key):
+        """
+        Return `True` if the item with the given `key` is known to have
+        expired.
+        """
+        expires = self._expiry.get(key)
+        return expires is not None and expires <= _now_ms()
+
+    def _track(self):
+        """
+        Return the approximate size of each item, keyed by key, measuring
+        them all if not already tracked.
+        """
+        if self._sizes is None:
+            backend = self.backend
+            self._sizes = {}
+            self._used = 0
+            self._recency = collections.OrderedDict()
+            for key in backend.keys():
+                size = self._size(key, backend[key])
+                self._sizes[key] = size
+                self._used += size
+                self._recency[key] = None
+        return self._sizes
+
+    def _measure(self, key):
+        """
+        Measure afresh the item with the given `key` (which may have changed,
+        or gone, without this data store knowing), while items are tracked.
+        """
+        self._used -= self._sizes.pop(key, 0)
+        self._recency.pop(key, None)
+        try:
+            raw_value = self.backend[key]
+        except KeyError:
+            return
+        size = self._size(key, raw_value)
+        self._sizes[key] = size
+        self._used += size
+        self._recency[key] = None
+
+    def _forget(self):
+        """
+        Forget what is known about the expiry and size of items, so it is
+        worked out afresh when needed.
+        """
+        self._expiry.clear()
+        self._sizes = None
+        self._recency = None
+        self._used = 0
+
+    def _write(self, key, raw_value, ops=None):
+        """
+        Write the `raw_value` of the item with the given `key` to the backend,
+        making room for it if there's a quota, and keep track of when it
+        expires, its size and its use. If the value was patched, `ops` are
+        the patch operations.
+        """
+        expires, _ = self._split(raw_value)
+        if expires is None:
+            self._expiry.pop(key, None)
+        else:
+            self._expiry[key] = expires
+        if self._quota is None and self._sizes is None:
+            self._put(key, raw_value, ops)
+            self._broadcast(key, raw_value)
+            self._changed(key)
+            return
+        sizes = self._track()
+        growth = self._size(key, raw_value) - sizes.get(key, 0)
+        self._make_room(key, growth)
+        while True:
+            try:
+                self._put(key, raw_value, ops)
+                break
+            except Exception:
+                # The browser's own limit (e.g. a QuotaExceededError) was
+                # reached first, so make more room if possible.
+                if self._quota is None or not self._evict_one(key):
+                    raise
+        self._used += growth
+        sizes[key] = sizes.get(key, 0) + growth
+        self._recency.pop(key, None)
+        self._recency[key] = None
+        self._broadcast(key, raw_value)
+        self._changed(key)
+
+    def _put(self, key, raw_value, ops):
+        """
+        Put the `raw_value` of the item with the given `key` in the backend,
+        telling it about the patch `ops`, if any.
+        """
+        if ops is None:
+            self.backend[key] = raw_value
+        else:
+            self.backend.set_patched(key, raw_value, ops)
+
+    def _erase(self, key):
+        """
+        Delete the item with the given `key` from the backend, and forget
+        everything about it.
+        """
+        del self.backend[key]
+        self._cache.pop(key, None)
+        self._expiry.pop(key, None)
+        self._compression.pop(key, None)
+        self._broadcast(key, None)
+        if self._sizes is not None:
+            self._used -= self._sizes.pop(key, 0)
+            self._recency.pop(key, None)
+        self._changed(key)
+
+    def _stale(self, key):
+        """
+        Mark the computed items that depend on the item with the given `key`
+        (or, if `None`, all of them) to be computed afresh when next read.
+        """
+        for item in self._computed.values():
+            if key is None or key in item.depends_on:
+                item.stale = True
+
+    def _changed(self, key):
+        """
+        Tell the collections the item with the given `key` has changed in the
+        backend (or, if `None`, that anything may have).
+        """
+        for collection in self._collections.values():
+            collection._reindex(key)
+
+    def _make_room(self, key, needed):
+        """
+        Evict items until there is room, within the quota, for `needed` more
+        bytes. The item with the given `key` is never evicted.
+        """
+        if self._quota is None or self._used + needed <= self._quota:
+            return
+        now = _now_ms()
+        for other, expires in list(self._expiry.items()):
+            if other != key and expires <= now:
+                self._evict(other, "expired")
+        while self._used + needed > self._quota:
+            if not self._evict_one(key):
+                break
+
+    def _evict_one(self, key):
+        """
+        Evict the least recently used item other than the one with the given
+        `key`. Returns `False` if there was nothing to evict.
+        """
+        for victim in self._recency:
+            if victim != key:
+                self._evict(victim, "lru")
+                return True
+        return False
+
+    def _evict(self, key, reason):
+        """
+        Remove the item with the given `key`, and announce why to the
+        `self.DATASTORE_EVICT_CHANNEL` channel.
+        """
+        try:
+            self._erase(key)
+        except KeyError:
+            return
+        publish(
+            Message(subject=key, reason=reason),
+            to_channel=self.DATASTORE_EVICT_CHANNEL,
+        )
+
+
+class _Computed:
+    """
+    An item made by `DataStore.computed`.
+    """
+
+    def __init__(self, datastore, name, fn, depends_on):
+        self.datastore = datastore
+        self.name = name
+        self.fn = fn
+        self.depends_on = list(depends_on)
+        self.value = None
+        self.stale = True
+
+    def get(self):
+        """
+        Return the value, computing it if any of the items it depends on
+        have changed.
+        """
+        if self.stale:
+            values = [self.datastore.get(key) for key in self.depends_on]
+            self.value = self.fn(*values)
+            self.stale = False
+        return self.value
+
+    def _channels(self):
+        """
+        Return the channels announcing changes to the items depended upon.
+        """
+        datastore = self.datastore
+        return [
+            datastore.DATASTORE_SET_CHANNEL,
+            datastore.DATASTORE_DELETE_CHANNEL,
+            datastore.DATASTORE_EVICT_CHANNEL,
+        ]
+
+    def attach(self):
+        """
+        Subscribe to changes to the items depended upon.
+        """
+        subscribe(self.changed, self._channels(), self.depends_on)
+        subscribe(
+            self.committed, self.datastore.DATASTORE_COMMIT_CHANNEL, "commit"
+        )
+
+    def detach(self):
+        """
+        Stop listening for changes.
+        """
+        try:
+            unsubscribe(self.changed, self._channels(), self.depends_on)
+            unsubscribe(
+                self.committed,
+                self.datastore.DATASTORE_COMMIT_CHANNEL,
+                "commit",
+            )
+        except ValueError:
+            # The subscriptions were already reset.
+            pass
+
+    def changed(self, message):
+        """
+        Handle a change to an item depended upon.
+        """
+        self.stale = True
+        self.datastore._refresh(self)
+
+    def committed(self, message):
+        """
+        Handle a transaction's changes, announced together.
+        """
+        for key in self.depends_on:
+            if key in message.changes or key in message.deleted:
+                self.changed(message)
+                return
+
+
+def _bisect(values, target):
+    """
+    Return the position of the first of the sorted `values` that isn't less
+    than the `target`. MicroPython has no `bisect` module.
+    """
+    low = 0
+    high = len(values)
+    while low < high:
+        middle = (low + high) // 2
+        if values[middle] < target:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class Collection:
+    """
+    Records (dictionaries) in a `DataStore`, each stored under its own key
+    made from the collection's name and the record's id (e.g. "orders/A1").
+    Made via `DataStore.collection`.
+
+    Records with a given value in a field (or a range of values) are found
+    via an index of that field, rather than by looking at every record. The
+    indexes are built when first needed, and then kept up to date as records
+    change, whether via the collection or not (e.g. in another tab). Within
+    a `transaction`, this happens once it's committed. Indexed values must
+    be hashable, and comparable with each other for `range`.
+
+    Setting or deleting a record publishes a message on the data store's
+    usual channels, whose subject is the record's key.
+    """
+
+    def __init__(self, datastore, name):
+        self.datastore = datastore
+        self.name = name
+        self._prefix = f"{name}/"
+        # The ids of the records, when known.
+        self._ids = None
+        # For each indexed field, the ids of the records with each value.
+        self._indexes = {}
+        # For each indexed field, the values in order (`None` until needed).
+        self._ordered = {}
+        # The values of the indexed fields of each record, by id.
+        self._fields = {}
+
+    def key(self, record_id):
+        """
+        Return the data store key of the record with the given `record_id`.
+        """
+        return f"{self._prefix}{record_id}"
+
+    def add_index(self, field):
+        """
+        Keep an index of the values of the given `field`.
+        """
+        if field in self._indexes:
+            return
+        self._indexes[field] = {}
+        self._ordered[field] = None
+        if self._ids is not None:
+            for record_id in list(self._ids):
+                self._index(record_id, self.datastore[self.key(record_id)])
+
+    def ids(self):
+        """
+        Return a list of the ids of the records.
+        """
+        return list(self._load())
+
+    def get(self, record_id, default=None):
+        """
+        Return the record with the given `record_id`, or the `default` if
+        there isn't one.
+        """
+        return self.datastore.get(self.key(record_id), default)
+
+    def put(self, record_id, record):
+        """
+        Store the `record` with the given `record_id`, replacing any record
+        already there.
+        """
+        self.datastore[self.key(record_id)] = record
+
+    def update(self, record_id, **fields):
+        """
+        Change the given `fields` of the record with the given `record_id`.
+        Only the changed fields are patched (see `DataStore.patch`).
+        """
+        ops = [
+            {"op": "set", "path": [field], "value": value}
+            for field, value in fields.items()
+        ]
+        self.datastore.patch(self.key(record_id), ops)
+
+    def delete(self, record_id):
+        """
+        Delete the record with the given `record_id`.
+        """
+        del self.datastore[self.key(record_id)]
+
+    def find(self, **criteria):
+        """
+        Return a list of the records whose fields have the values given as
+        `**criteria`. Indexed fields are looked up in their index, and only
+        the records found are checked against any other fields.
+
+        E.g.
+
+        ```python
+        orders.find(status="open", customer="Ada")
+        ```
+        """
+        ids = None
+        others = {}
+        for field, value in criteria.items():
+            if field in self._indexes:
+                found = self._index_for(field).get(value, set())
+                ids = set(found) if ids is None else ids & found
+            else:
+                others[field] = value
+        if ids is None:
+            ids = self._load()
+        return self._records(ids, others)
+
+    def range(self, field, low=None, high=None):
+        """
+        Return a list of the records whose value for the indexed `field` is
+        from `low` up to (but not including) `high`, in order of that value.
+        Either may be `None`, to leave the range open at that end.
+        """
+        index = self._index_for(field)
+        values = self._ordered[field]
+        if values is None:
+            values = sorted(index)
+            self._ordered[field] = values
+        start = 0 if low is None else _bisect(values, low)
+        end = len(values) if high is None else _bisect(values, high)
+        result = []
+        for value in values[start:end]:
+            result.extend(self._records(index[value], {}))
+        return result
+
+    def __contains__(self, record_id):
+        return str(record_id) in self._load()
+
+    def __len__(self):
+        return len(self._load())
+
+    def _records(self, ids, criteria):
+        """
+        Return the records with the given `ids` that match the `criteria`.
+        """
+        datastore = self.datastore
+        result = []
+        for record_id in ids:
+            record = datastore.get(self.key(record_id))
+            if record is None:
+                continue
+            for field, value in criteria.items():
+                if record.get(field) != value:
+                    break
+            else:
+                result.append(record)
+        return result
+
+    def _index_for(self, field):
+        """
+        Return the index of the given `field`, loading the records if needed.
+        """
+        if field not in self._indexes:
+            raise ValueError(f"No index for field '{field}' in {self.name}.")
+        self._load()
+        return self._indexes[field]
+
+    def _load(self):
+        """
+        Return the set of ids of the records, finding and indexing them if
+        not already known.
+        """
+        if self._ids is None:
+            self._ids = set()
+            prefix = self._prefix
+            for key in self.datastore.keys():
+                if key.startswith(prefix):
+                    record = self.datastore.get(key)
+                    if record is not None:
+                        self._index(key[len(prefix) :], record)
+        return self._ids
+
+    def _index(self, record_id, record):
+        """
+        Add the `record` with the given `record_id` to the indexes.
+        """
+        self._ids.add(record_id)
+        fields = {}
+        for field, index in self._indexes.items():
+            if not isinstance(record, dict) or field not in record:
+                continue
+            value = record[field]
+            fields[field] = value
+            ids = index.get(value)
+            if ids is None:
+                index[value] = ids = set()
+                self._ordered[field] = None
+            ids.add(record_id)
+        self._fields[record_id] = fields
+
+    def _unindex(self, record_id):
+        """
+        Remove the record with the given `record_id` from the indexes.
+        """
+        self._ids.discard(record_id)
+        fields = self._fields.pop(record_id, {})
+        for field, value in fields.items():
+            index = self._indexes[field]
+            ids = index.get(value)
+            if ids is not None:
+                ids.discard(record_id)
+                if not ids:
+                    del index[value]
+                    self._ordered[field] = None
+
+    def _reindex(self, key):
+        """
+        Bring the indexes up to date for a change to the item with the given
+        `key` in the backend. A `key` of `None` means anything may have
+        changed, so the records are found afresh when next needed.
+        """
+        if self._ids is None:
+            return
+        if key is None:
+            self._ids = None
+            self._fields = {}
+            for field in self._indexes:
+                self._indexes[field] = {}
+                self._ordered[field] = None
+            return
+        if not key.startswith(self._prefix):
+            return
+        record_id = key[len(self._prefix) :]
+        self._unindex(record_id)
+        record = self.datastore.get(key)
+        if record is not None:
+            self._index(record_id, record)
+
+
+class _Transaction:
+    """
+    The context manager returned by `DataStore.transaction`.
+    """
+
+    def __init__(self, datastore, aggregate):
+        self.datastore = datastore
+        self.aggregate = aggregate
+
+    def __enter__(self):
+        self.datastore._begin(self.aggregate)
+        return self.datastore
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.datastore._end(exc_type is None)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self.datastore._end(exc_type is None):
+            await self.datastore.backend.sync()
+        return False
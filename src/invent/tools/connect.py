@@ -87,7 +87,9 @@ VALID_SERIAL_MODES = {
 }
 
 
-def web_request(url, result_key, response_format="text", *args, **kwargs):
+def web_request(
+    url, result_key, response_format="text", *args, ttl=None, **kwargs
+):
     """
     Fetch a URL and store the response in the datastore at
     `result_key`.
@@ -103,9 +105,11 @@ def web_request(url, result_key, response_format="text", *args, **kwargs):
     response status is not OK, the `WEB_ERROR` flag is stored at
     `result_key` along with the HTTP status and message, so a
     subscriber can distinguish success from failure by inspecting the
-    stored value. Extra positional and keyword arguments are forwarded
-    to the underlying fetch call (e.g. `method="POST"`, `body=...`,
-    headers, and so on). See the
+    stored value. If a `ttl` (time to live) is given, the stored value
+    expires after that many seconds (see `DataStore.set`), so cached
+    responses don't fill the datastore. Extra positional and keyword
+    arguments are forwarded to the underlying fetch call (e.g.
+    `method="POST"`, `body=...`, headers, and so on). See the
     [PyScript fetch API](https://docs.pyscript.net/latest/api/fetch/)
     for the full list.
 
@@ -133,6 +137,14 @@ def web_request(url, result_key, response_format="text", *args, **kwargs):
         result_key="music_data",
         response_format="bytes",
     )
+
+    # Cache the response for an hour.
+    connect.web_request(
+        url="https://api.example.com/news",
+        result_key="news",
+        response_format="json",
+        ttl=3600,
+    )
     ```
     """
 
@@ -148,15 +160,14 @@ def web_request(url, result_key, response_format="text", *args, **kwargs):
             if response_format == "json":
                 result = await response.json()
             elif response_format == "bytes":
-                # NOTE: The bytearray will be stored in the datastore as
-                # a type of bytes, which is supported by the custom JSON
-                # encoding / decoding in the datastore.
+                # NOTE: The bytearray is stored in the datastore in its
+                # compact binary form, and read back as a type of bytes.
                 result = await response.bytearray()
             else:
                 result = await response.text()
         else:
             result = WEB_ERROR + f": {response.status} {response.message}"
-        invent.datastore[result_key] = result
+        invent.datastore.set(result_key, result, ttl=ttl)
 
     asyncio.create_task(wrapper())
 
@@ -286,7 +297,9 @@ class _InventWebSocket:
       arrives as `.data` on the message.
     - Subscribe with subject `"status"` to receive connection state
       changes; the new state arrives as `.status`, one of
-      `"connecting"`, `"open"`, `"error"`, or `"closed"`.
+      `"connecting"`, `"open"`, `"error"`, or `"closed"`. The latest
+      status is retained, so subscribing with `replay=True` delivers
+      the current state straight away.
 
     Example usage:
 
@@ -363,11 +376,13 @@ class _InventWebSocket:
 
     def _publish_status(self, status):
         """
-        Publish a status message to the channel.
+        Publish a status message to the channel, retained so late
+        subscribers can catch up.
         """
         invent.publish(
             message=invent.Message("status", status=status),
             to_channel=self.channel,
+            retain=True,
         )
 
     def _send(self, data):
@@ -478,7 +493,9 @@ class _InventSerial:
       changes; the new state arrives as `.status`, one of
       `"connecting"`, `"open"`, `"error"`, `"closed"`, or
       `"reconnecting"`. An `"error"` status may carry a `.reason`
-      attribute describing the cause.
+      attribute describing the cause. The latest status is retained,
+      so subscribing with `replay=True` delivers the current state
+      straight away.
 
     Messages published with subject `"send"` before the port is open
     are queued and dispatched as soon as the connection is ready.
@@ -654,11 +671,13 @@ class _InventSerial:
 
     def _publish_status(self, status, reason=None):
         """
-        Publish a status message to the channel(s).
+        Publish a status message to the channel(s), retained so late
+        subscribers can catch up.
         """
         invent.publish(
             message=invent.Message("status", status=status, reason=reason),
             to_channel=self._channels,
+            retain=True,
         )
 
     def _publish_message(self, data):
@@ -1058,7 +1077,8 @@ class _InventBLE:
       changes; the new state arrives as `.status`, one of
       `"connecting"`, `"open"`, `"error"`, or `"closed"`. An
       `"error"` status carries a `.reason` attribute describing the
-      cause.
+      cause. The latest status is retained, so subscribing with
+      `replay=True` delivers the current state straight away.
 
     Characteristic capability is auto-detected at connect time: if the
     characteristic supports notify, notifications are started and
@@ -1208,11 +1228,13 @@ class _InventBLE:
 
     def _publish_status(self, status, reason=None):
         """
-        Publish a status message to the channel.
+        Publish a status message to the channel, retained so late
+        subscribers can catch up.
         """
         invent.publish(
             message=invent.Message("status", status=status, reason=reason),
             to_channel=self.channel,
+            retain=True,
         )
 
     def _publish_message(self, data):
@@ -42,6 +42,25 @@ from .measures import TSHIRT_SIZES, GAP_SIZES, COMPONENT_DISTRIBUTION
 _DEFAULT_ICON = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 256 256"><path fill="currentColor" d="M140 180a12 12 0 1 1-12-12a12 12 0 0 1 12 12M128 72c-22.06 0-40 16.15-40 36v4a8 8 0 0 0 16 0v-4c0-11 10.77-20 24-20s24 9 24 20s-10.77 20-24 20a8 8 0 0 0-8 8v8a8 8 0 0 0 16 0v-.72c18.24-3.35 32-17.9 32-35.28c0-19.85-17.94-36-40-36m104 56A104 104 0 1 1 128 24a104.11 104.11 0 0 1 104 104m-16 0a88 88 0 1 0-88 88a88.1 88.1 0 0 0 88-88"/></svg>'  # noqa
 
 
+class _ReadOnlyDict(dict):
+    """
+    A dictionary that can't be changed, as returned by
+    `Component.properties` and `Component.events` (which are shared by every
+    caller).
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(_("Component registries are read-only."))
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    clear = _read_only
+    pop = _read_only
+    popitem = _read_only
+    setdefault = _read_only
+    update = _read_only
+
+
 class Component:
     """
     A base class for all user interface components.
@@ -58,6 +77,9 @@ class Component:
 
     # Used for quick component look-up.
     _components_by_id = {}
+
+    # The properties and events of each class, worked out when first needed.
+    _registries = {}
     # Used for generating unique component names.
     _component_counter = 0
 
@@ -308,24 +330,46 @@ class Component:
     @classmethod
     def properties(cls):
         """
-        Return a dictionary of the component's properties.
+        Return a read-only dictionary of the component's properties, in
+        name order.
         """
-        return {
-            name: value
-            for name, value in getmembers_static(cls)
-            if isinstance(value, Property)
-        }
+        return cls._registry()[0]
 
     @classmethod
     def events(cls):
         """
-        Return a dictionary of the component's events.
+        Return a read-only dictionary of the component's events, in name
+        order.
         """
-        return {
-            name: value
-            for name, value in getmembers_static(cls)
-            if isinstance(value, Event)
-        }
+        return cls._registry()[1]
+
+    @classmethod
+    def _registry(cls):
+        """
+        Return a `(properties, events)` tuple for the class.
+
+        Looking through the class (and its bases) is slow, and the answer
+        doesn't change once the class is defined, so it's only done the
+        first time it's asked for. Each class has its own entry, so a
+        subclass never sees its parent's registry.
+        """
+        registry = Component._registries.get(cls)
+        if registry is None:
+            members = getmembers_static(cls)
+            registry = (
+                _ReadOnlyDict(
+                    (name, value)
+                    for name, value in members
+                    if isinstance(value, Property)
+                ),
+                _ReadOnlyDict(
+                    (name, value)
+                    for name, value in members
+                    if isinstance(value, Event)
+                ),
+            )
+            Component._registries[cls] = registry
+        return registry
 
     @classmethod
     def _generate_unique_id(cls):
@@ -402,7 +446,7 @@ class Component:
         """
         properties = {}
         for property_name, property_obj in sorted(self.properties().items()):
-            from_datastore = self.get_from_datastore(property_name)
+            from_datastore = property_obj.get_from_datastore(self)
             if from_datastore:
                 property_value = repr(from_datastore)
             else:
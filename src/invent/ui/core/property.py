@@ -161,7 +161,9 @@ class Property:
                 else:
                     message_value = message.value
                 setattr(obj, self.private_name, self.validate(message_value))
-                self._react_on_change(obj, self.private_name)
+                # Patched values (see DataStore.patch) come with the ops.
+                ops = None if with_function else getattr(message, "ops", None)
+                self._react_on_change(obj, self.private_name, ops)
 
             # Attach the "from_datastore" instance to the object.
             self.set_from_datastore(obj, value, reactor)
@@ -194,12 +196,17 @@ class Property:
 
         setattr(obj, self.from_datastore_name, value)
         if value:
+            # The reactor is kept alive by obj, so a weak subscription means
+            # obj can be garbage collected once it's no longer used.
             invent.subscribe(
-                reactor, invent.datastore.DATASTORE_SET_CHANNEL, value.key
+                reactor,
+                invent.datastore.DATASTORE_SET_CHANNEL,
+                value.key,
+                weak=True,
             )
             setattr(obj, reactor_prop, reactor)
 
-    def _react_on_change(self, obj, property_name):
+    def _react_on_change(self, obj, property_name, ops=None):
         """
         Ensure any reactive behaviour relating to the setting of the property
         is enacted. This involves two steps:
@@ -208,6 +215,11 @@ class Property:
            the new value is directly set on the object's element.
         2. Call the object's on_changed handler for the specified property
            name, if it exists.
+
+        If the new value was patched in the datastore, `ops` describes the
+        changes. If the object has an on_FOO_patched handler, it is called
+        with the `ops` instead of on_FOO_changed, so it can update only what
+        has changed.
         """
         # Map the value to an HTML attribute whose name is the value of
         # map_to_attribute.
@@ -222,6 +234,13 @@ class Property:
                 obj, self.private_name
             )
 
+        # Handle the existence of an on_FOO_patched function.
+        if ops:
+            on_patched = getattr(obj, "on" + property_name + "_patched", None)
+            if on_patched:
+                on_patched(ops)
+                return
+
         # Handle the existence of an on_FOO_changed function.
         on_changed = getattr(obj, "on" + property_name + "_changed", None)
         if on_changed:
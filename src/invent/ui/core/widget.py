@@ -79,7 +79,8 @@ class Widget(Component):
         """
         Given the name of one of the class's defined events, publish a message
         to all the widget's channels with the message content defined in
-        kwargs.
+        kwargs. A handler listening to several of the widget's channels is
+        called only once.
         """
         # Ensure self.channel is treated as a comma-separated list of channel
         # names.
@@ -90,4 +91,4 @@ class Widget(Component):
                 if channel.strip()
             ]
             message = event_instance.create_message(source=self, **kwargs)
-            invent.publish(message, to_channel=channels)
+            invent.publish(message, to_channel=channels, dedupe=True)
@@ -26,6 +26,7 @@ import js
 from pyscript import js_import
 from pyscript.ffi import create_proxy, to_js
 from pyscript.web import div
+from invent.channels import debounce
 from invent.i18n import _
 from invent.ui.core import (
     Widget,
@@ -35,9 +36,9 @@ from invent.ui.core import (
     TextProperty,
 )
 
-# Delay in seconds before the changed event fires after the user stops
+# Delay in milliseconds before the changed event fires after the user stops
 # typing.
-_DEBOUNCE_DELAY = 0.3
+_DEBOUNCE_MS = 300
 
 # CodeMirror convenience bundle: exports basicSetup and EditorView.
 _cm = None
@@ -156,8 +157,8 @@ class CodeEditor(Widget):
         # Guard: True while we are setting code programmatically, so
         # that on_code_changed does not dispatch back into CodeMirror.
         self._setting_code = False
-        # Handle for the in-flight debounce coroutine.
-        self._debounce_task = None
+        # Emits the changed event once the user pauses typing.
+        self._emit_debounced = debounce(self._emit_changed, _DEBOUNCE_MS)
         # Proxy for the CodeMirror updateListener; kept alive so it
         # is not garbage-collected between reconfigurations.
         self._update_proxy = create_proxy(self._on_cm_update)
@@ -288,16 +289,13 @@ class CodeEditor(Widget):
         """
         if not update.docChanged:
             return
-        if self._debounce_task:
-            self._debounce_task.cancel()
-        self._debounce_task = asyncio.create_task(self._emit_changed())
+        self._emit_debounced(update)
 
-    async def _emit_changed(self):
+    def _emit_changed(self, update):
         """
-        Wait for the debounce delay, then sync code to the property and
+        Once the user has paused typing, sync code to the property and
         publish the changed event.
         """
-        await asyncio.sleep(_DEBOUNCE_DELAY)
         self._setting_code = True
         self.code = self._view.state.doc.toString()
         self._setting_code = False
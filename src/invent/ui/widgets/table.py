@@ -73,22 +73,62 @@ class Table(Widget):
                     tr(*[th(header) for header in temp_data[0]])
                 )
                 temp_data = temp_data[1:]
-            # If the first item in each row is a header, use it as such.
-            if self.row_headers:
-                self._table_body.append(
-                    [
-                        tr(th(row[0]), *[td(cell) for cell in row[1:]])
-                        for row in temp_data
-                    ]
-                )
-            else:
-                self._table_body.append(
-                    [tr(*[td(cell) for cell in row]) for row in temp_data]
-                )
+            self._table_body.append([self._row(row) for row in temp_data])
+
+    def _row(self, row):
+        """
+        Return a table row for the given `row` of data in the table's body.
+        """
+        # If the first item in each row is a header, use it as such.
+        if self.row_headers:
+            return tr(th(row[0]), *[td(cell) for cell in row[1:]])
+        return tr(*[td(cell) for cell in row])
 
     def on_data_changed(self):
         self._tabulate()
 
+    def on_data_patched(self, ops):
+        """
+        Update only the rows of the table changed by the patch `ops` (see
+        `DataStore.patch`), if they are simple changes to rows in the table's
+        body. Otherwise, rebuild the table.
+
+        The data is already patched, so rows are read from it as it is now.
+        Removing a row moves the rows after it, so it is only done on its
+        own. If the table has no header row or body rows yet, it is rebuilt,
+        so the first rows end up where they belong.
+        """
+        rows = self._table_body._dom_element.rows
+        header = self._table_head._dom_element.rows
+        if not rows.length or (self.column_headers and not header.length):
+            self._tabulate()
+            return
+        offset = 1 if self.column_headers else 0
+        changes = []
+        for op in ops:
+            kind = op.get("op")
+            path = op.get("path", [])
+            in_body = path and isinstance(path[0], int) and path[0] >= offset
+            if kind == "append" and not path:
+                changes.append(("append", None))
+            elif in_body and (kind != "remove" or len(path) > 1):
+                # A change within a row, so refresh the whole row.
+                changes.append(("refresh", path[0] - offset))
+            elif in_body and len(ops) == 1:
+                changes.append(("remove", path[0] - offset))
+            else:
+                self._tabulate()
+                return
+        for kind, index in changes:
+            if kind == "append":
+                row = self.data[rows.length + offset]
+                self._table_body.append(self._row(row))
+            elif kind == "refresh":
+                row = self._row(self.data[index + offset])
+                rows[index].replaceWith(row._dom_element)
+            else:
+                rows[index].remove()
+
     def on_column_headers_changed(self):
         self._tabulate()
 
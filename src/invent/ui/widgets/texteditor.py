@@ -30,6 +30,7 @@ import js
 from pyscript import js_import
 from pyscript.ffi import create_proxy
 from pyscript.web import div
+from invent.channels import debounce
 from invent.i18n import _
 from invent.ui.core import (
     Widget,
@@ -38,9 +39,9 @@ from invent.ui.core import (
     TextProperty,
 )
 
-# Delay in seconds before the changed event fires after the user
+# Delay in milliseconds before the changed event fires after the user
 # stops typing.
-_DEBOUNCE_DELAY = 0.3
+_DEBOUNCE_MS = 300
 
 # CDN URLs for Quill and its Snow theme stylesheet.
 _QUILL_JS = "https://esm.sh/quill@2.0.3"
@@ -108,7 +109,8 @@ class TextEditor(Widget):
         self._config = config if config is not None else _DEFAULT_CONFIG
         self._quill = None  # Quill instance; set after async init.
         self._updating = False  # Guards against feedback loops.
-        self._debounce_task = None  # Current debounce coroutine.
+        # Syncs and publishes the changed event once typing pauses.
+        self._sync_debounced = debounce(self._sync, _DEBOUNCE_MS)
         super().__init__(**kwargs)
 
     @classmethod
@@ -180,22 +182,16 @@ class TextEditor(Widget):
 
         # Attach a debounced listener for all user-driven changes.
         def _on_change(delta, old, source):
-            """Reschedule the debounced sync on every edit."""
-            if self._debounce_task:
-                self._debounce_task.cancel()
-            self._debounce_task = asyncio.create_task(self._debounced_sync())
+            """Restart the debounced sync on every edit."""
+            self._sync_debounced(source)
 
         self._quill.on("text-change", create_proxy(_on_change))
 
-    async def _debounced_sync(self):
+    def _sync(self, source):
         """
-        Wait for typing to pause, then read Quill's content, update
-        both Python properties, and publish the changed event.
+        Once typing has paused, read Quill's content, update both Python
+        properties, and publish the changed event.
         """
-        try:
-            await asyncio.sleep(_DEBOUNCE_DELAY)
-        except asyncio.CancelledError:
-            return
         if self._quill is None:
             return
 
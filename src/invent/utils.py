@@ -4,6 +4,7 @@ Utility and compatibility functions.
 
 import inspect
 import sys
+import time
 from pyscript.web import div, page, link, style
 from .app import App
 from .i18n import _
@@ -78,6 +79,29 @@ def iscoroutinefunction(obj):
     return inspect.iscoroutinefunction(obj)
 
 
+def timer():
+    """
+    Cross-interpreter way to start timing something. Pass the result to
+    `elapsed_ms` to find out how long has passed.
+
+    MicroPython's clock wraps around, so the result is only meaningful to
+    `elapsed_ms`.
+    """
+    if is_micropython:  # pragma: no cover
+        return time.ticks_us()
+    return time.perf_counter()
+
+
+def elapsed_ms(start):
+    """
+    Return the milliseconds (as a float) that have passed since the `start`
+    returned by `timer`.
+    """
+    if is_micropython:  # pragma: no cover
+        return time.ticks_diff(time.ticks_us(), start) / 1000
+    return (time.perf_counter() - start) * 1000
+
+
 def capitalize(s):
     """
     Cross-interpreter implementation of `str.capitalize`.
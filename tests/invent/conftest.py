@@ -4,7 +4,7 @@ from pyscript import window
 import invent
 import invent.app
 import invent.ui
-from invent.channels import _channels
+import invent.channels
 
 
 async def setup():
@@ -19,7 +19,7 @@ async def setup():
         await invent.start_datastore()
     invent.datastore.clear()
     await invent.datastore.sync()
-    _channels.clear()
+    invent.channels._reset()
     test_placeholder = page.find("test-app")
     if test_placeholder:
         test_placeholder.remove()
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import invent
 import upytest
 import umock
@@ -19,6 +20,24 @@ def test_message_attributes():
     """
     m = invent.Message("message", data="foo")
     assert m.data == "foo"
+    content = {"value": [1, 2], "source": None, "count": 0, "ops": {}}
+    m = invent.Message(subject="change", **content)
+    assert m._subject == "change"
+    for name, value in content.items():
+        assert getattr(m, name) == value
+    assert m.value is content["value"]
+
+
+def test_message_missing_attribute():
+    """
+    Asking for content that isn't in the message raises an AttributeError, so
+    hasattr and getattr with a default work as expected.
+    """
+    m = invent.Message("message", data="foo")
+    with upytest.raises(AttributeError):
+        m.value
+    assert not hasattr(m, "value")
+    assert getattr(m, "value", None) is None
 
 
 def test_subject():
@@ -218,3 +237,691 @@ def test_unsubscribe_missing_channel():
         invent.unsubscribe(
             handler, from_channel="testing", when_subject="test"
         )
+
+
+def test_subscribe_wildcard_subject():
+    """
+    A handler subscribed with the "*" subject is called for every message
+    published to the channel.
+    """
+    handler = umock.Mock()
+    invent.subscribe(handler, to_channel="datastore:set", when_subject="*")
+    m1 = invent.Message(subject="foo", value=1)
+    m2 = invent.Message(subject="bar", value=2)
+    invent.publish(m1, to_channel="datastore:set")
+    invent.publish(m2, to_channel="datastore:set")
+    # Wrong channel.
+    invent.publish(m1, to_channel="datastore:delete")
+    assert handler.call_count == 2
+    assert handler.call_args_list[0][0][0] is m1
+    assert handler.call_args_list[1][0][0] is m2
+
+
+def test_subscribe_wildcard_channel_part():
+    """
+    A "*" part of a channel name matches exactly one part of the name of the
+    channel to which a message is published.
+    """
+    handler = umock.Mock()
+    invent.subscribe(handler, to_channel="sensor/*", when_subject="reading")
+    m = invent.Message(subject="reading", value=21)
+    invent.publish(m, to_channel="sensor/kitchen")
+    invent.publish(m, to_channel="sensor/garden")
+    # Too deep, too shallow and the wrong prefix don't match.
+    invent.publish(m, to_channel="sensor/kitchen/fridge")
+    invent.publish(m, to_channel="sensor")
+    invent.publish(m, to_channel="actuator/kitchen")
+    assert handler.call_count == 2
+
+
+def test_subscribe_deep_wildcard_channel():
+    """
+    A trailing "**" part of a channel name matches every channel beneath it.
+    """
+    handler = umock.Mock()
+    invent.subscribe(handler, to_channel="sensor/**", when_subject="*")
+    m = invent.Message(subject="reading", value=21)
+    invent.publish(m, to_channel="sensor/kitchen")
+    invent.publish(m, to_channel="sensor/kitchen/fridge")
+    # The prefix on its own, or a different prefix, doesn't match.
+    invent.publish(m, to_channel="sensor")
+    invent.publish(m, to_channel="actuator/kitchen")
+    assert handler.call_count == 2
+
+
+def test_subscribe_deep_wildcard_must_be_last():
+    """
+    Using "**" anywhere other than the end of a channel name is an error.
+    """
+    handler = umock.Mock()
+    with upytest.raises(ValueError):
+        invent.subscribe(
+            handler, to_channel="sensor/**/fridge", when_subject="reading"
+        )
+
+
+def test_publish_overlapping_subscriptions_call_handler_once():
+    """
+    If several subscriptions for the same handler match a message published
+    to a channel, the handler is only called once.
+    """
+    handler = umock.Mock()
+    invent.subscribe(handler, to_channel="sensor/kitchen", when_subject="*")
+    invent.subscribe(
+        handler, to_channel="sensor/kitchen", when_subject="reading"
+    )
+    invent.subscribe(handler, to_channel="sensor/*", when_subject="reading")
+    invent.subscribe(handler, to_channel="sensor/**", when_subject="*")
+    m = invent.Message(subject="reading", value=21)
+    invent.publish(m, to_channel="sensor/kitchen")
+    handler.assert_called_once_with(m)
+
+
+def test_unsubscribe_wildcards():
+    """
+    Unsubscribing from a wildcard channel and subject stops the handler being
+    called, and unknown wildcard patterns raise an error.
+    """
+    handler = umock.Mock()
+    invent.subscribe(handler, to_channel="sensor/*", when_subject="*")
+    m = invent.Message(subject="reading", value=21)
+    invent.publish(m, to_channel="sensor/kitchen")
+    invent.unsubscribe(handler, from_channel="sensor/*", when_subject="*")
+    invent.publish(m, to_channel="sensor/kitchen")
+    handler.assert_called_once_with(m)
+    # The now unused pattern is forgotten.
+    with upytest.raises(ValueError):
+        invent.unsubscribe(handler, from_channel="sensor/*", when_subject="*")
+
+
+def test_coalesce_latest():
+    """
+    Messages published to a channel coalesced with the LATEST policy are held
+    back until flushed, and then only the most recent message for each
+    subject is delivered.
+    """
+    handler = umock.Mock()
+    invent.subscribe(handler, to_channel="sensor", when_subject="*")
+    invent.channels.coalesce("sensor")
+    m1 = invent.Message(subject="reading", value=1)
+    m2 = invent.Message(subject="reading", value=2)
+    m3 = invent.Message(subject="status", value="ok")
+    invent.publish(m1, to_channel="sensor")
+    invent.publish(m3, to_channel="sensor")
+    invent.publish(m2, to_channel="sensor")
+    assert handler.call_count == 0
+    invent.channels.flush()
+    assert handler.call_count == 2
+    # Ordered by most recent publication.
+    assert handler.call_args_list[0][0][0] is m3
+    assert handler.call_args_list[1][0][0] is m2
+    # Nothing left to deliver.
+    invent.channels.flush()
+    assert handler.call_count == 2
+
+
+def test_coalesce_accumulate():
+    """
+    Messages published to a channel coalesced with the ACCUMULATE policy are
+    delivered as a single message per subject, with a list of all the
+    published messages.
+    """
+    handler = umock.Mock()
+    invent.subscribe(handler, to_channel="sensor", when_subject="reading")
+    invent.channels.coalesce("sensor", policy=invent.channels.ACCUMULATE)
+    m1 = invent.Message(subject="reading", value=1)
+    m2 = invent.Message(subject="reading", value=2)
+    invent.publish(m1, to_channel="sensor")
+    invent.publish(m2, to_channel="sensor")
+    invent.channels.flush()
+    assert handler.call_count == 1
+    msg = handler.call_args_list[0][0][0]
+    assert msg._subject == "reading"
+    assert msg.messages == [m1, m2]
+
+
+async def test_coalesce_flushes_on_next_frame():
+    """
+    Coalesced messages are delivered automatically before the browser draws
+    the next frame.
+    """
+    handler = umock.Mock()
+    invent.subscribe(handler, to_channel="sensor", when_subject="reading")
+    invent.channels.coalesce("sensor")
+    for i in range(10):
+        invent.publish(
+            invent.Message(subject="reading", value=i), to_channel="sensor"
+        )
+    await asyncio.sleep(0.1)
+    assert handler.call_count == 1
+    assert handler.call_args_list[0][0][0].value == 9
+
+
+def test_coalesce_stop():
+    """
+    Setting a channel's policy to None delivers any waiting messages and
+    returns the channel to delivering messages immediately.
+    """
+    handler = umock.Mock()
+    invent.subscribe(handler, to_channel="sensor", when_subject="reading")
+    invent.channels.coalesce("sensor")
+    m1 = invent.Message(subject="reading", value=1)
+    m2 = invent.Message(subject="reading", value=2)
+    invent.publish(m1, to_channel="sensor")
+    invent.channels.coalesce("sensor", policy=None)
+    handler.assert_called_once_with(m1)
+    invent.publish(m2, to_channel="sensor")
+    assert handler.call_count == 2
+
+
+def test_coalesce_unknown_policy():
+    """
+    An unknown coalescing policy is an error.
+    """
+    with upytest.raises(ValueError):
+        invent.channels.coalesce("sensor", policy="sometimes")
+
+
+async def test_async_handlers_called_in_order():
+    """
+    Messages for an asynchronous handler are queued and handled in the order
+    in which they were published.
+    """
+    received = []
+
+    async def handler(message):
+        await asyncio.sleep(0.01 * (5 - message.value))
+        received.append(message.value)
+
+    invent.subscribe(handler, to_channel="testing", when_subject="test")
+    for i in range(5):
+        invent.publish(
+            invent.Message(subject="test", value=i), to_channel="testing"
+        )
+    await asyncio.sleep(0.3)
+    assert received == [0, 1, 2, 3, 4], received
+
+
+async def test_async_queue_drop_oldest():
+    """
+    When an asynchronous handler's queue is full, the oldest waiting message
+    is dropped by default.
+    """
+    received = []
+
+    async def handler(message):
+        received.append(message.value)
+
+    invent.channels.configure_queue(handler, max_size=2)
+    invent.subscribe(handler, to_channel="testing", when_subject="test")
+    for i in range(5):
+        invent.publish(
+            invent.Message(subject="test", value=i), to_channel="testing"
+        )
+    stats = invent.channels.queue_stats()
+    assert stats["queues"]["handler"]["depth"] == 2
+    assert stats["dropped"] == 3
+    await asyncio.sleep(0.1)
+    assert received == [3, 4], received
+    stats = invent.channels.queue_stats()
+    # The idle queue is forgotten, but its work is counted.
+    assert stats["queues"] == {}
+    assert stats["processed"] == 2
+    assert stats["dropped"] == 3
+
+
+async def test_async_queue_drop_newest():
+    """
+    With the DROP_NEWEST policy, messages arriving at a full queue are
+    dropped.
+    """
+    received = []
+
+    async def handler(message):
+        received.append(message.value)
+
+    invent.channels.configure_queue(
+        handler, max_size=2, overflow=invent.channels.DROP_NEWEST
+    )
+    invent.subscribe(handler, to_channel="testing", when_subject="test")
+    for i in range(5):
+        invent.publish(
+            invent.Message(subject="test", value=i), to_channel="testing"
+        )
+    await asyncio.sleep(0.1)
+    assert received == [0, 1], received
+
+
+async def test_apublish_blocks_until_space():
+    """
+    With the BLOCK policy, apublish waits for room in the queue so no
+    messages are dropped.
+    """
+    received = []
+
+    async def handler(message):
+        await asyncio.sleep(0.01)
+        received.append(message.value)
+
+    invent.channels.configure_queue(
+        handler, max_size=2, overflow=invent.channels.BLOCK
+    )
+    invent.subscribe(handler, to_channel="testing", when_subject="test")
+    for i in range(5):
+        await invent.channels.apublish(
+            invent.Message(subject="test", value=i), to_channel="testing"
+        )
+        queues = invent.channels.queue_stats()["queues"]
+        assert queues["handler"]["depth"] <= 2
+    await asyncio.sleep(0.2)
+    assert received == [0, 1, 2, 3, 4], received
+    assert invent.channels.queue_stats()["dropped"] == 0
+
+
+def test_configure_queue_bad_values():
+    """
+    Unknown overflow policies, and sizes or concurrency of less than one, are
+    errors.
+    """
+
+    async def handler(message):
+        pass
+
+    with upytest.raises(ValueError):
+        invent.channels.configure_queue(handler, overflow="explode")
+    with upytest.raises(ValueError):
+        invent.channels.configure_queue(handler, max_size=0)
+    with upytest.raises(ValueError):
+        invent.channels.configure_queue(handler, concurrency=0)
+
+
+@upytest.skip(
+    "MicroPython has no weak references", skip_when=invent.is_micropython
+)
+def test_weak_subscription_is_forgotten():
+    """
+    A weakly subscribed handler is called while it exists, and its
+    subscription is forgotten once it has been garbage collected.
+    """
+    import gc
+
+    calls = []
+
+    class Listener:
+        def handle(self, message):
+            calls.append(message)
+
+    listener = Listener()
+    invent.subscribe(
+        listener.handle, to_channel="testing", when_subject="test", weak=True
+    )
+    m = invent.Message(subject="test", data="Test")
+    invent.publish(m, to_channel="testing")
+    assert calls == [m]
+    del listener
+    gc.collect()
+    invent.publish(m, to_channel="testing")
+    assert calls == [m]
+    # The dead subscription, and its channel, were removed while publishing.
+    assert "testing" not in invent.channels._channels
+
+
+def test_unsubscribe_weak_subscription():
+    """
+    A weakly subscribed handler can be unsubscribed in the usual way.
+    """
+    handler = umock.Mock()
+
+    def function_handler(message):
+        handler(message)
+
+    invent.subscribe(
+        function_handler, to_channel="testing", when_subject="test", weak=True
+    )
+    m = invent.Message(subject="test", data="Test")
+    invent.publish(m, to_channel="testing")
+    invent.unsubscribe(
+        function_handler, from_channel="testing", when_subject="test"
+    )
+    invent.publish(m, to_channel="testing")
+    handler.assert_called_once_with(m)
+
+
+def test_stats_subscribers():
+    """
+    The number of handlers subscribed to each subject on each channel, or
+    wildcard pattern, is always available.
+    """
+    invent.subscribe(umock.Mock(), to_channel="testing", when_subject="a")
+    invent.subscribe(umock.Mock(), to_channel="testing", when_subject="a")
+    invent.subscribe(umock.Mock(), to_channel="sensor/*", when_subject="*")
+    result = invent.channels.stats()
+    assert result["subscribers"] == {
+        "testing": {"a": 2},
+        "sensor/*": {"*": 1},
+    }, result
+    assert "channels" not in result
+
+
+def test_stats_publish_and_handlers():
+    """
+    Once enabled, statistics record how many messages were published to each
+    channel, how many handlers were called, and how long they took.
+    """
+
+    def handler(message):
+        pass
+
+    invent.channels.enable_stats()
+    invent.subscribe(handler, to_channel="testing", when_subject="test")
+    m = invent.Message(subject="test", data="Test")
+    for i in range(3):
+        invent.publish(m, to_channel="testing")
+    # No handlers listening for this message.
+    invent.publish(invent.Message(subject="other"), to_channel="testing")
+    result = invent.channels.stats()
+    assert result["channels"]["testing"] == {
+        "published": 4,
+        "delivered": 3,
+        "max_fan_out": 1,
+    }, result["channels"]
+    info = [v for k, v in result["handlers"].items() if "handler" in k][0]
+    assert info["called"] == 3
+    assert sum(info["histogram"]["counts"]) == 3
+    assert (
+        len(info["histogram"]["counts"])
+        == len(info["histogram"]["buckets"]) + 1
+    )
+    # The JSON export contains the same information.
+    assert json.loads(invent.channels.stats_json()) == result
+    # Resetting forgets the numbers.
+    invent.channels.reset_stats()
+    assert invent.channels.stats()["channels"] == {}
+    # Disabling stops recording.
+    invent.channels.disable_stats()
+    assert "channels" not in invent.channels.stats()
+
+
+async def test_stats_slow_handler():
+    """
+    Handlers taking longer than the time budget are counted as slow.
+    """
+
+    async def slow_handler(message):
+        await asyncio.sleep(0.05)
+
+    invent.channels.enable_stats(slow_handler_ms=10)
+    invent.subscribe(slow_handler, to_channel="testing", when_subject="test")
+    invent.publish(invent.Message(subject="test"), to_channel="testing")
+    await asyncio.sleep(0.1)
+    result = invent.channels.stats()
+    info = [v for k, v in result["handlers"].items() if "slow_handler" in k][0]
+    assert info["called"] == 1
+    assert info["slow"] == 1
+    assert info["max_ms"] >= 10
+
+
+def test_retain_and_replay():
+    """
+    A retained message is replayed to handlers subscribing later with
+    replay=True, but not to those subscribing without it.
+    """
+    m1 = invent.Message(subject="status", status="connecting")
+    m2 = invent.Message(subject="status", status="open")
+    invent.publish(m1, to_channel="socket", retain=True)
+    invent.publish(m2, to_channel="socket", retain=True)
+    # Not retained.
+    invent.publish(invent.Message(subject="message"), to_channel="socket")
+    late = umock.Mock()
+    invent.subscribe(late, to_channel="socket", when_subject="*", replay=True)
+    # Only the latest retained message is replayed.
+    late.assert_called_once_with(m2)
+    no_replay = umock.Mock()
+    invent.subscribe(no_replay, to_channel="socket", when_subject="status")
+    assert no_replay.call_count == 0
+
+
+def test_replay_wildcard_channels():
+    """
+    Retained messages are replayed for channels matching a wildcard pattern.
+    """
+    m1 = invent.Message(subject="status", status="open")
+    m2 = invent.Message(subject="status", status="closed")
+    invent.publish(m1, to_channel="serial/a", retain=True)
+    invent.publish(m2, to_channel="bluetooth/b", retain=True)
+    handler = umock.Mock()
+    invent.subscribe(
+        handler, to_channel="serial/*", when_subject="status", replay=True
+    )
+    handler.assert_called_once_with(m1)
+
+
+def test_retain_limit_and_clear():
+    """
+    The oldest retained messages are forgotten when they no longer fit in
+    the retain limit, and clear_retained forgets them on request.
+    """
+    m1 = invent.Message(subject="a", data="x" * 50)
+    m2 = invent.Message(subject="b", data="y" * 50)
+    invent.channels.set_retain_limit(len(str(m1)) + 10)
+    invent.publish(m1, to_channel="testing", retain=True)
+    invent.publish(m2, to_channel="testing", retain=True)
+    handler = umock.Mock()
+    invent.subscribe(
+        handler, to_channel="testing", when_subject="*", replay=True
+    )
+    handler.assert_called_once_with(m2)
+    invent.channels.clear_retained("testing")
+    handler.reset_mock()
+    invent.subscribe(
+        handler, to_channel="testing", when_subject="b", replay=True
+    )
+    assert handler.call_count == 0
+
+
+def test_flush_keeps_stats_and_retained():
+    """
+    Flushing coalesced channels delivers waiting messages without forgetting
+    statistics or retained messages.
+    """
+    invent.channels.enable_stats()
+    m = invent.Message(subject="status", status="open")
+    invent.publish(m, to_channel="socket", retain=True)
+    invent.channels.flush()
+    assert "channels" in invent.channels.stats()
+    handler = umock.Mock()
+    invent.subscribe(
+        handler, to_channel="socket", when_subject="status", replay=True
+    )
+    handler.assert_called_once_with(m)
+
+
+async def test_subscribe_debounce():
+    """
+    A debounced handler is called once messages pause, with the latest one.
+    """
+    handler = umock.Mock()
+    invent.subscribe(
+        handler, to_channel="testing", when_subject="key", debounce_ms=30
+    )
+    messages = [invent.Message(subject="key", key=k) for k in "abc"]
+    for m in messages:
+        invent.publish(m, to_channel="testing")
+        await asyncio.sleep(0.01)
+    assert handler.call_count == 0
+    await asyncio.sleep(0.06)
+    handler.assert_called_once_with(messages[-1])
+
+
+async def test_subscribe_debounce_leading():
+    """
+    A debounced handler with leading=True and trailing=False is called with
+    the first message only.
+    """
+    handler = umock.Mock()
+    invent.subscribe(
+        handler,
+        to_channel="testing",
+        when_subject="key",
+        debounce_ms=30,
+        leading=True,
+        trailing=False,
+    )
+    messages = [invent.Message(subject="key", key=k) for k in "abc"]
+    for m in messages:
+        invent.publish(m, to_channel="testing")
+    handler.assert_called_once_with(messages[0])
+    await asyncio.sleep(0.06)
+    handler.assert_called_once_with(messages[0])
+
+
+async def test_subscribe_throttle():
+    """
+    A throttled handler is called with the first message straight away, and
+    with the latest of the rest once the wait is over.
+    """
+    handler = umock.Mock()
+    invent.subscribe(
+        handler, to_channel="testing", when_subject="slide", throttle_ms=30
+    )
+    messages = [invent.Message(subject="slide", value=v) for v in range(5)]
+    for m in messages:
+        invent.publish(m, to_channel="testing")
+    handler.assert_called_once_with(messages[0])
+    await asyncio.sleep(0.06)
+    assert handler.call_count == 2
+    handler.assert_called_with(messages[-1])
+
+
+async def test_subscribe_throttle_twice():
+    """
+    Subscribing the same throttled handler again doesn't call it twice.
+    """
+    handler = umock.Mock()
+    for _ in range(2):
+        invent.subscribe(
+            handler, to_channel="testing", when_subject="slide", throttle_ms=30
+        )
+    invent.subscribe(
+        handler,
+        to_channel=["testing", "other"],
+        when_subject="slide",
+        throttle_ms=30,
+    )
+    m = invent.Message(subject="slide", value=1)
+    invent.publish(m, to_channel="testing")
+    handler.assert_called_once_with(m)
+    invent.unsubscribe(handler, from_channel="testing", when_subject="slide")
+    assert invent.channels.has_subscribers("other", "slide")
+    invent.unsubscribe(handler, from_channel="other", when_subject="slide")
+    assert invent.channels.stats()["subscribers"] == {}
+
+
+def test_subscribe_limit_bad_arguments():
+    """
+    Both throttling and debouncing, or neither leading nor trailing calls,
+    are rejected.
+    """
+    with upytest.raises(ValueError):
+        invent.subscribe(
+            print,
+            to_channel="testing",
+            when_subject="test",
+            throttle_ms=10,
+            debounce_ms=10,
+        )
+    with upytest.raises(ValueError):
+        invent.subscribe(
+            print,
+            to_channel="testing",
+            when_subject="test",
+            throttle_ms=10,
+            leading=False,
+            trailing=False,
+        )
+    with upytest.raises(ValueError):
+        invent.channels.debounce(print, 0)
+
+
+async def test_unsubscribe_debounced():
+    """
+    A debounced handler can be unsubscribed, and messages waiting for it are
+    forgotten.
+    """
+    handler = umock.Mock()
+    invent.subscribe(
+        handler, to_channel="testing", when_subject="key", debounce_ms=20
+    )
+    invent.publish(invent.Message(subject="key"), to_channel="testing")
+    invent.unsubscribe(handler, from_channel="testing", when_subject="key")
+    await asyncio.sleep(0.05)
+    assert handler.call_count == 0
+    assert invent.channels.stats()["subscribers"] == {}
+
+
+def test_publish_dedupe():
+    """
+    With dedupe=True, a handler subscribed to several of the channels is
+    called once. Without it, once per channel.
+    """
+    handler = umock.Mock()
+    other = umock.Mock()
+    invent.subscribe(handler, to_channel=["a", "b"], when_subject="test")
+    invent.subscribe(other, to_channel="b", when_subject="test")
+    m = invent.Message(subject="test")
+    invent.publish(m, to_channel=["a", "b"])
+    assert handler.call_count == 2
+    handler.reset_mock()
+    invent.publish(m, to_channel=["a", "b"], dedupe=True)
+    handler.assert_called_once_with(m)
+    assert other.call_count == 2
+    # The remembered handlers are forgotten when subscriptions change.
+    invent.unsubscribe(handler, from_channel=["a", "b"], when_subject="test")
+    handler.reset_mock()
+    invent.publish(m, to_channel=["a", "b"], dedupe=True)
+    assert handler.call_count == 0
+    assert other.call_count == 3
+
+
+def test_subscribe_during_publish():
+    """
+    Handlers may subscribe and unsubscribe while a message is being
+    published, without upsetting delivery of that message.
+    """
+    calls = []
+
+    def first(message):
+        calls.append("first")
+        invent.unsubscribe(first, from_channel="testing", when_subject="test")
+        invent.subscribe(third, to_channel="testing", when_subject="test")
+
+    def second(message):
+        calls.append("second")
+
+    def third(message):
+        calls.append("third")
+
+    invent.subscribe(first, to_channel="testing", when_subject="test")
+    invent.subscribe(second, to_channel="testing", when_subject="test")
+    m = invent.Message(subject="test")
+    invent.publish(m, to_channel="testing")
+    assert sorted(calls) == ["first", "second"], calls
+    calls.clear()
+    invent.publish(m, to_channel="testing")
+    assert sorted(calls) == ["second", "third"], calls
+
+
+def test_has_subscribers():
+    """
+    It's possible to check if anything would receive a message, including
+    via wildcards.
+    """
+    handler = umock.Mock()
+    assert not invent.channels.has_subscribers("testing", "test")
+    invent.subscribe(handler, to_channel="testing", when_subject="test")
+    assert invent.channels.has_subscribers("testing", "test")
+    assert not invent.channels.has_subscribers("testing", "other")
+    invent.subscribe(handler, to_channel="wild/*", when_subject="test")
+    assert invent.channels.has_subscribers("wild/card", "test")
+    invent.unsubscribe(handler, from_channel="testing", when_subject="test")
+    assert not invent.channels.has_subscribers("testing", "test")
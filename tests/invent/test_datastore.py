@@ -1,8 +1,20 @@
+import json
 import invent
 import upytest
 import umock
 from pyscript import window
-from invent.datastore import _FakeStorage, LocalStorageBackend, IndexDBBackend
+from invent.datastore import (
+    _FakeStorage,
+    _LocalBroadcastChannel,
+    _MessageEvent,
+    LocalStorageBackend,
+    IndexDBBackend,
+    JournalBackend,
+    MemoryBackend,
+    BINARY_TAG,
+    COMPRESSED_TAG,
+    EXPIRY_TAG,
+)
 
 # Tests for default LocalStorageBackend based datastore.
 
@@ -235,6 +247,38 @@ def test_localstoragebackend_namespace_key():
     assert result == "testfoo"
 
 
+async def test_localstoragebackend_key_index():
+    """
+    The keys in the backend's namespace are gathered once, and then kept up
+    to date as items are set and deleted, by any backend in the page or by
+    another tab. Syncing keeps them, while reloading gathers them afresh.
+    """
+    window.localStorage.setItem("invent-a", "1")
+    window.localStorage.setItem("other-b", "2")
+    backend = LocalStorageBackend()
+    backend.reload(None)
+    assert backend.keys() == ["a"]
+    window.localStorage.setItem("invent-z", "1")
+    await backend.sync()
+    assert "z" not in backend
+    backend.reload(None)
+    assert "z" in backend
+    del backend["z"]
+    backend["c"] = "3"
+    assert "c" in backend
+    assert len(backend) == 2
+    # Another backend in the page shares the same keys.
+    other = LocalStorageBackend()
+    del other["a"]
+    assert "a" not in backend
+    assert len(backend) == 1
+    # Changes made by another tab arrive as storage events.
+    backend._on_storage(umock.Mock(key="invent-d", newValue="4"))
+    assert "d" in backend
+    backend._on_storage(umock.Mock(key="invent-c", newValue=None))
+    assert backend.keys() == ["d"]
+
+
 async def test_datastore_get_set_del_item():
     """
     Getting, setting and deleting an item should work as expected.
@@ -288,6 +332,852 @@ async def test_datastore_get_set_del_item():
         del ds["a"]
 
 
+def test_datastore_binary_values():
+    """
+    Bytes are stored compactly, one character per byte, and read back as
+    bytes. Bytes stored as base64 by earlier versions can still be read.
+    """
+    ds = invent.DataStore()
+    data = bytes(range(256))
+    ds["all"] = data
+    ds["array"] = bytearray(b"foo")
+    raw = ds.backend["all"]
+    assert raw.startswith(BINARY_TAG)
+    assert len(raw) == len(data) + len(BINARY_TAG)
+    ds.invalidate()
+    assert ds["all"] == data
+    assert ds["array"] == b"foo"
+    ds.backend["legacy"] = '{"__bytearray__": "Zm9v"}'
+    assert ds["legacy"] == b"foo"
+
+
+def test_datastore_read_cache():
+    """
+    Decoded values are kept to hand, so reading the same item again doesn't
+    decode it again. Setting or deleting the item forgets the decoded value.
+    """
+    ds = invent.DataStore()
+    ds["a"] = [1, 2, 3]
+    assert ds["a"] == [1, 2, 3]
+    assert ds["a"] == [1, 2, 3]
+    stats = ds.cache_stats()
+    assert stats["hits"] == 1, stats
+    assert stats["misses"] == 1, stats
+    assert stats["size"] == 1, stats
+    ds["a"] = "changed"
+    assert ds["a"] == "changed"
+    del ds["a"]
+    with upytest.raises(KeyError):
+        ds["a"]
+    assert ds.cache_stats()["size"] == 0
+
+
+def test_datastore_read_cache_eviction():
+    """
+    Once full, the least recently read value is forgotten first. A cache
+    size of zero turns the cache off.
+    """
+    ds = invent.DataStore(_cache_size=2)
+    ds.update(a=1, b=2, c=3)
+    ds["a"]
+    ds["b"]
+    # Reading "a" again makes "b" the least recently read.
+    ds["a"]
+    ds["c"]
+    assert list(ds._cache) == ["a", "c"]
+    uncached = invent.DataStore(_cache_size=0)
+    uncached["d"] = 4
+    assert uncached["d"] == 4
+    assert uncached.cache_stats()["size"] == 0
+
+
+def test_datastore_read_cache_invalidate():
+    """
+    Changes made by another tab, reported via the browser's storage event,
+    cause the decoded value to be forgotten.
+    """
+    ds = invent.DataStore()
+    ds["a"] = 1
+    ds["b"] = 2
+    ds["a"]
+    ds["b"]
+    ds.backend._on_storage(umock.Mock(key="invent-a"))
+    assert "a" not in ds._cache
+    assert "b" in ds._cache
+    # Keys outside the namespace are ignored.
+    ds.backend._on_storage(umock.Mock(key="other-b"))
+    assert "b" in ds._cache
+    # A null key means localStorage was cleared.
+    ds.backend._on_storage(umock.Mock(key=None))
+    assert ds.cache_stats()["size"] == 0
+    ds["a"]
+    ds.invalidate("a")
+    assert ds.cache_stats()["size"] == 0
+
+
+def test_datastore_transaction():
+    """
+    Changes made in a transaction are only written and announced at the end,
+    once per key, and can be read back within the transaction.
+    """
+    ds = invent.DataStore()
+    ds["gone"] = True
+    handler = umock.Mock()
+    invent.subscribe(
+        handler, to_channel=ds.DATASTORE_SET_CHANNEL, when_subject="*"
+    )
+    with ds.transaction():
+        ds["a"] = 1
+        ds["a"] = 2
+        ds["b"] = b"foo"
+        del ds["gone"]
+        assert ds["a"] == 2
+        assert "gone" not in ds
+        assert sorted(ds.keys()) == ["a", "b"]
+        assert "a" not in ds.backend
+        assert handler.call_count == 0
+    assert sorted(ds.backend.keys()) == ["a", "b"]
+    assert ds["a"] == 2
+    assert ds["b"] == b"foo"
+    assert "gone" not in ds
+    assert handler.call_count == 2
+    assert handler.call_args_list[0][0][0].value == 2
+
+
+def test_datastore_transaction_rollback():
+    """
+    If an exception is raised within a transaction, its changes are thrown
+    away.
+    """
+    ds = invent.DataStore()
+    ds["a"] = 1
+    handler = umock.Mock()
+    invent.subscribe(
+        handler, to_channel=ds.DATASTORE_SET_CHANNEL, when_subject="*"
+    )
+    with upytest.raises(RuntimeError):
+        with ds.transaction():
+            ds["a"] = 2
+            ds["b"] = 3
+            raise RuntimeError("Oops")
+    assert ds["a"] == 1
+    assert "b" not in ds
+    assert handler.call_count == 0
+
+
+def test_datastore_transaction_backend_failure():
+    """
+    If the backend fails while a transaction is being committed, the changes
+    already written are undone.
+    """
+
+    class FailingBackend(LocalStorageBackend):
+        def __setitem__(self, key, value):
+            if key == "bad":
+                raise RuntimeError("Quota exceeded")
+            super().__setitem__(key, value)
+
+    ds = invent.DataStore(_backend=FailingBackend())
+    ds["a"] = 1
+    with upytest.raises(RuntimeError):
+        with ds.transaction():
+            ds["a"] = 2
+            ds["b"] = 3
+            ds["bad"] = 4
+    assert ds["a"] == 1
+    assert "b" not in ds
+
+
+async def test_datastore_transaction_aggregate():
+    """
+    An aggregated transaction announces all its changes in a single message.
+    """
+    ds = invent.DataStore()
+    ds["gone"] = True
+    handler = umock.Mock()
+    invent.subscribe(
+        handler, to_channel=ds.DATASTORE_COMMIT_CHANNEL, when_subject="commit"
+    )
+    async with ds.transaction(aggregate=True):
+        ds.update(a=1, b=2)
+        del ds["gone"]
+    assert handler.call_count == 1
+    message = handler.call_args_list[0][0][0]
+    assert message.changes == {"a": 1, "b": 2}
+    assert message.deleted == ["gone"]
+
+
+def test_datastore_patch():
+    """
+    Patching a value changes only the given parts of it, and publishes the
+    new value along with the operations.
+    """
+    ds = invent.DataStore()
+    ds["table"] = [["Name", "Age"], ["Ann", 30], ["Bob", 40]]
+    handler = umock.Mock()
+    invent.subscribe(
+        handler, to_channel=ds.DATASTORE_SET_CHANNEL, when_subject="table"
+    )
+    ops = [
+        {"op": "set", "path": [1, 1], "value": 31},
+        {"op": "append", "path": [], "value": ["Cat", 50]},
+        {"op": "remove", "path": [2]},
+    ]
+    ds.patch("table", ops)
+    expected = [["Name", "Age"], ["Ann", 31], ["Cat", 50]]
+    assert ds["table"] == expected
+    ds.invalidate()
+    assert ds["table"] == expected
+    message = handler.call_args_list[0][0][0]
+    assert message.value == expected
+    assert message.ops == ops
+
+
+def test_datastore_patch_bad_ops():
+    """
+    Operations that don't fit the value raise a ValueError, and leave the
+    stored value as it was.
+    """
+    ds = invent.DataStore()
+    ds["data"] = {"a": [1, 2]}
+    with upytest.raises(ValueError):
+        ds.patch(
+            "data",
+            [
+                {"op": "append", "path": ["a"], "value": 3},
+                {"op": "remove", "path": ["missing"]},
+            ],
+        )
+    assert ds["data"] == {"a": [1, 2]}
+    with upytest.raises(ValueError):
+        ds.patch("data", [{"op": "unknown", "path": ["a"]}])
+    with upytest.raises(KeyError):
+        ds.patch("missing", [])
+
+
+def test_datastore_patch_not_stored():
+    """
+    If a patched value isn't stored, because the transaction is thrown away
+    or the backend fails, the value read is the one still stored.
+    """
+    ds = invent.DataStore()
+    ds["rows"] = [1, 2, 3]
+    assert ds["rows"] == [1, 2, 3]
+    with upytest.raises(RuntimeError):
+        with ds.transaction():
+            ds.patch("rows", [{"op": "append", "path": [], "value": 99}])
+            assert ds["rows"] == [1, 2, 3, 99]
+            raise RuntimeError("Boom")
+    assert ds["rows"] == [1, 2, 3]
+    assert ds.backend["rows"] == "[1, 2, 3]"
+
+    def full(key, value, ops):
+        raise RuntimeError("QuotaExceededError")
+
+    ds.backend.set_patched = full
+    with upytest.raises(RuntimeError):
+        ds.patch("rows", [{"op": "append", "path": [], "value": 99}])
+    assert ds["rows"] == [1, 2, 3]
+    assert ds.backend["rows"] == "[1, 2, 3]"
+
+
+def test_datastore_compression():
+    """
+    Values longer than the threshold are stored compressed, if that makes
+    them smaller, and read back as they were. How well compression worked is
+    recorded for each key.
+    """
+    ds = invent.DataStore(_compress_threshold=100)
+    rows = [["row", i % 10] for i in range(200)]
+    ds["rows"] = rows
+    ds["small"] = [1, 2, 3]
+    ds["noise"] = bytes(range(256))
+    ds.set("expiring", rows, ttl=3600)
+    raw = ds.backend["rows"]
+    assert raw.startswith(COMPRESSED_TAG)
+    assert ds.backend["small"] == "[1, 2, 3]"
+    # Values that don't compress are stored as they are, but still measured.
+    assert ds.backend["noise"].startswith(BINARY_TAG)
+    assert ds.compression_stats("noise")["ratio"] >= 1
+    assert ds.compression_stats("small") is None
+    stats = ds.compression_stats("rows")
+    assert stats["stored_size"] == len(raw)
+    assert stats["ratio"] < 0.5, stats
+    assert stats["decompress_ms"] is None
+    ds.invalidate()
+    assert ds["rows"] == rows
+    assert ds["noise"] == bytes(range(256))
+    assert ds["expiring"] == rows
+    assert ds.compression_stats("rows")["decompress_ms"] >= 0
+    assert sorted(ds.compression_stats()) == ["expiring", "noise", "rows"]
+    del ds["rows"]
+    assert ds.compression_stats("rows") is None
+    uncompressed = invent.DataStore(_compress_threshold=None)
+    uncompressed["rows"] = rows
+    assert not uncompressed.backend["rows"].startswith(COMPRESSED_TAG)
+
+
+async def test_datastore_bulk():
+    """
+    Many items can be set, read and deleted at once. Setting and deleting
+    happens as a single transaction.
+    """
+    ds = invent.DataStore()
+    ds.clear()
+    mock_publish = umock.Mock()
+    mock_sync = umock.AsyncMock()
+    with umock.patch("invent.datastore:publish", mock_publish):
+        ds.backend.sync = mock_sync
+        await ds.set_many({"a": 1, "b": [2], "c": "three"})
+        assert mock_sync.call_count == 1
+        assert mock_publish.call_count == 3
+        result = await ds.get_many(["a", "b", "missing"])
+        assert result == {"a": 1, "b": [2]}
+        await ds.delete_many(["a", "c", "missing"])
+        assert mock_sync.call_count == 2
+        assert mock_publish.call_count == 5
+    assert ds.keys() == ["b"]
+
+
+async def test_datastore_iter_range():
+    """
+    The items in a range of keys can be read in order, in batches.
+    """
+    ds = invent.DataStore()
+    ds.clear()
+    for i in range(10):
+        ds[f"log-{i}"] = i
+    ds["other"] = "ignored"
+    result = []
+    async for key, value in ds.iter_range("log-2", "log-7", batch_size=2):
+        result.append((key, value))
+    assert result == [(f"log-{i}", i) for i in range(2, 7)]
+    result = []
+    async for key, value in ds.iter_range(start="log-8"):
+        result.append(key)
+    assert result == ["log-8", "log-9", "other"]
+
+
+def test_datastore_computed_lazy():
+    """
+    With nothing subscribed, a computed item is only computed when read, and
+    only once until the items it depends on change.
+    """
+    ds = invent.DataStore()
+    calls = []
+
+    def total(prices, quantity):
+        calls.append(1)
+        return sum(prices or []) * (quantity or 0)
+
+    assert ds.computed("total", total, depends_on=["prices", "quantity"])
+    ds["prices"] = [1, 2]
+    ds["quantity"] = 2
+    assert len(calls) == 0
+    assert "total" in ds
+    assert "total" not in ds.keys()
+    assert ds["total"] == 6
+    assert ds.get("total") == 6
+    assert len(calls) == 1
+    ds["quantity"] = 3
+    assert len(calls) == 1
+    assert ds["total"] == 9
+    assert len(calls) == 2
+    with upytest.raises(ValueError):
+        ds["total"] = 1
+    with upytest.raises(ValueError):
+        del ds["total"]
+
+
+async def test_datastore_computed_sync():
+    """
+    A computed item is computed afresh after the items it depends on are
+    invalidated, or the data store syncs with its backend (either of which
+    may mean they were changed other than via the data store).
+    """
+    ds = invent.DataStore()
+    ds["x"] = 1
+    ds["y"] = 1
+    ds.computed("double", lambda x: x * 2, depends_on=["x"])
+    assert ds["double"] == 2
+    ds.backend["x"] = "5"
+    ds.invalidate("y")
+    assert ds["double"] == 2
+    ds.invalidate("x")
+    assert ds["double"] == 10
+    ds.backend["x"] = "7"
+    await ds.sync()
+    assert ds["double"] == 14
+    ds.clear()
+    ds.backend["x"] = "3"
+    assert ds["double"] == 6
+
+
+def test_datastore_computed_subscribed():
+    """
+    When something is subscribed to a computed item, it is computed once
+    when the items it depends on change, and published like a stored item.
+    """
+    ds = invent.DataStore()
+    ds.update(a=1, b=2)
+    calls = []
+
+    def add(a, b):
+        calls.append(1)
+        return a + b
+
+    ds.computed("sum", add, depends_on=["a", "b"])
+    ds.computed("double", lambda x: x * 2, depends_on=["sum"])
+    handler = umock.Mock()
+    invent.subscribe(
+        handler,
+        to_channel=ds.DATASTORE_SET_CHANNEL,
+        when_subject=["sum", "double"],
+    )
+
+    def published():
+        # The order handlers are called in isn't guaranteed.
+        return sorted(c[0][0].value for c in handler.call_args_list)
+
+    ds["a"] = 10
+    assert len(calls) == 1
+    assert published() == [12, 24]
+    handler.reset_mock()
+    # Changes made together cause a single update.
+    with ds.transaction():
+        ds["a"] = 20
+        ds["b"] = 30
+    assert len(calls) == 2
+    assert published() == [50, 100]
+    handler.reset_mock()
+    with ds.transaction(aggregate=True):
+        ds["a"] = 0
+        ds["b"] = 1
+    assert len(calls) == 3
+    assert published() == [1, 2]
+
+
+async def test_datastore_export_import():
+    """
+    The items can be exported one at a time as lines of JSON, and imported
+    in batches into another data store.
+    """
+    ds = invent.DataStore()
+    ds.clear()
+    ds["a"] = {"x": [1, 2]}
+    ds["data"] = b"\x00\xff"
+    ds.set("later", "soon", ttl=3600)
+    ds.set("gone", 1, ttl=0)
+    ds.computed("double", lambda a: a, depends_on=["a"])
+    lines = list(ds.export_stream())
+    assert len(lines) == 3
+    assert all(line.endswith("\n") for line in lines)
+    items = {item["key"]: item for item in map(json.loads, lines)}
+    assert items["a"] == {"key": "a", "value": {"x": [1, 2]}}
+    assert items["data"] == {"key": "data", "bytes": "AP8="}
+    assert items["later"]["expires"] == ds._expiry["later"]
+    # Exporting doesn't fill the values kept to hand.
+    assert ds.cache_stats()["size"] == 0
+    other = invent.DataStore(_backend=MemoryBackend())
+    other.backend.sync = umock.AsyncMock()
+    count = await other.import_stream(lines + ["\n"], batch_size=2)
+    assert count == 3
+    assert other.backend.sync.call_count == 2
+    assert other["a"] == {"x": [1, 2]}
+    assert other["data"] == b"\x00\xff"
+    assert other["later"] == "soon"
+    assert abs(other._expiry["later"] - ds._expiry["later"]) < 1000
+    with upytest.raises(ValueError):
+        await other.import_stream(['{"key": "b", "value": 2}', "not json"])
+    assert other["b"] == 2
+
+
+def test_datastore_ttl():
+    """
+    Items set with a ttl expire: they are evicted when next read, and the
+    eviction is announced. Patching an item keeps its expiry.
+    """
+    ds = invent.DataStore()
+    ds.set("fresh", [1], ttl=3600)
+    ds.set("stale", "old", ttl=0)
+    ds["forever"] = 1
+    assert ds.backend["fresh"].startswith(EXPIRY_TAG)
+    assert ds["fresh"] == [1]
+    ds.patch("fresh", [{"op": "append", "path": [], "value": 2}])
+    assert ds.backend["fresh"].startswith(EXPIRY_TAG)
+    assert "stale" not in ds
+    ds.invalidate()
+    assert ds["fresh"] == [1, 2]
+    mock_publish = umock.Mock()
+    with umock.patch("invent.datastore:publish", mock_publish):
+        with upytest.raises(KeyError):
+            ds["stale"]
+    assert "stale" not in ds.backend
+    assert mock_publish.call_count == 1
+    msg = mock_publish.call_args_list[0][0][0]
+    assert msg._subject == "stale"
+    assert msg.reason == "expired"
+    assert (
+        mock_publish.call_args_list[0][1]["to_channel"]
+        == ds.DATASTORE_EVICT_CHANNEL
+    )
+    # Expired items not yet read can be removed in one go.
+    ds.set("a", 1, ttl=0)
+    ds.set("b", 2, ttl=0)
+    ds.invalidate()
+    assert ds.remove_expired() == 2
+    assert sorted(ds.keys()) == ["forever", "fresh"]
+
+
+def test_datastore_ttl_patch_in_transaction():
+    """
+    Patching an item within a transaction keeps the expiry it was given
+    within the transaction, if any.
+    """
+    ds = invent.DataStore()
+    append = [{"op": "append", "path": [], "value": 2}]
+    ds.set("kept", [1], ttl=3600)
+    ds["expiring"] = [1]
+    with ds.transaction():
+        ds["kept"] = [1]
+        ds.patch("kept", append)
+        ds.set("expiring", [1], ttl=0)
+        ds.patch("expiring", append)
+    assert ds.backend["kept"] == "[1, 2]"
+    assert ds.backend["expiring"].startswith(EXPIRY_TAG)
+    assert ds["kept"] == [1, 2]
+    assert "expiring" not in ds
+
+
+def test_datastore_ttl_fresh_store():
+    """
+    A data store that hasn't read an expired item yet returns the default
+    for it, rather than raising a `KeyError`.
+    """
+    ds = invent.DataStore()
+    ds.set("tmp", 1, ttl=0)
+    ds.set("gone", 2, ttl=0)
+    ds.set("again", 3, ttl=0)
+    fresh = invent.DataStore()
+    assert fresh.get("tmp", "default") == "default"
+    assert "tmp" not in fresh.backend
+    assert fresh.pop("gone", "default") == "default"
+    assert fresh.setdefault("again", 4) == 4
+    assert fresh["again"] == 4
+
+
+def test_datastore_quota():
+    """
+    With a quota, the least recently used items are evicted to make room
+    for new ones, and the usage is tracked.
+    """
+    ds = invent.DataStore()
+    ds.clear()
+    assert ds.usage() == {"bytes": 0, "keys": 0, "quota": None}
+    # Each item takes 2 * (1 + 12) bytes.
+    ds["a"] = "x" * 10
+    ds["b"] = "y" * 10
+    assert ds.usage()["bytes"] == 52
+    ds.set_quota(60)
+    # Reading "a" makes "b" the least recently used.
+    ds["a"]
+    mock_publish = umock.Mock()
+    with umock.patch("invent.datastore:publish", mock_publish):
+        ds["c"] = "z" * 10
+    assert sorted(ds.keys()) == ["a", "c"]
+    assert ds.usage() == {"bytes": 52, "keys": 2, "quota": 60}
+    evicted = mock_publish.call_args_list[0]
+    assert evicted[0][0]._subject == "b"
+    assert evicted[0][0].reason == "lru"
+    assert evicted[1]["to_channel"] == ds.DATASTORE_EVICT_CHANNEL
+    # Expired items are evicted before those still in use.
+    ds.set_quota(120)
+    ds.set("d", "w" * 10, ttl=0)
+    ds["e"] = "v" * 10
+    assert sorted(ds.keys()) == ["a", "c", "e"]
+    del ds["a"]
+    assert ds.usage()["bytes"] == 52
+    ds.set_quota()
+    ds["f"] = "u" * 10
+    assert len(ds) == 3
+    assert ds.usage()["bytes"] == 78
+    # Items changed elsewhere (e.g. in another tab) are measured afresh,
+    # without measuring everything again.
+    sizes = ds._sizes
+    ds.backend["c"] = '"z"'
+    ds.invalidate("c")
+    assert ds.usage() == {"bytes": 60, "keys": 3, "quota": None}
+    del ds.backend["e"]
+    ds.invalidate("e")
+    assert ds.usage() == {"bytes": 34, "keys": 2, "quota": None}
+    assert ds._sizes is sizes
+
+
+def test_datastore_share():
+    """
+    Changes are shared with data stores in other tabs, where they are
+    applied and published. Out of date or repeated changes are ignored.
+    """
+    ds1 = invent.DataStore(_backend=JournalBackend(_FakeStorage()))
+    ds2 = invent.DataStore(_backend=JournalBackend(_FakeStorage()))
+    ds1.share("test", _channel_class=_LocalBroadcastChannel)
+    ds2.share("test", _channel_class=_LocalBroadcastChannel)
+    handler = umock.Mock()
+    invent.subscribe(
+        handler,
+        to_channel=[ds2.DATASTORE_SET_CHANNEL, ds2.DATASTORE_DELETE_CHANNEL],
+        when_subject="a",
+    )
+    # Both data stores are in this tab, so the handler is called by each.
+    ds1["a"] = [1]
+    assert ds2["a"] == [1]
+    assert handler.call_count == 2
+    assert handler.call_args_list[-1][0][0].value == [1]
+    ds1.patch("a", [{"op": "append", "path": [], "value": 2}])
+    assert ds2["a"] == [1, 2]
+    assert handler.call_count == 4
+    # An out of date change, or one from this tab, is ignored.
+    stale = {"key": "a", "raw": "[0]", "version": 1, "origin": ds1._origin}
+    ds2._on_broadcast(_MessageEvent(json.dumps(stale)))
+    stale["origin"] = ds2._origin
+    stale["version"] = 10
+    ds2._on_broadcast(_MessageEvent(json.dumps(stale)))
+    assert ds2["a"] == [1, 2]
+    assert handler.call_count == 4
+    # Changes go both ways.
+    ds2["a"] = "from two"
+    assert ds1["a"] == "from two"
+    del ds1["a"]
+    assert "a" not in ds2
+    # A deleted item's message has no value.
+    assert not hasattr(handler.call_args_list[-1][0][0], "value")
+    ds1["b"] = 1
+    ds1.clear()
+    assert len(ds2) == 0
+    ds2.unshare()
+    ds1["c"] = 1
+    assert "c" not in ds2
+    ds1.unshare()
+
+
+def test_datastore_share_local_storage():
+    """
+    When tabs share localStorage, changes from other tabs are noticed and
+    published, rather than applied again.
+    """
+    ds1 = invent.DataStore()
+    ds2 = invent.DataStore()
+    ds1.share("test", _channel_class=_LocalBroadcastChannel)
+    ds2.share("test", _channel_class=_LocalBroadcastChannel)
+    ds2["a"] = 1
+    assert ds2["a"] == 1
+    handler = umock.Mock()
+    invent.subscribe(
+        handler, to_channel=ds2.DATASTORE_SET_CHANNEL, when_subject="a"
+    )
+    ds1["a"] = 2
+    assert ds2["a"] == 2
+    assert handler.call_args_list[0][0][0].value == 2
+    ds1.unshare()
+    ds2.unshare()
+
+
+def test_datastore_collection():
+    """
+    Records in a collection are found via the indexes of their fields, which
+    are kept up to date as records change. Each record is published under
+    its own key.
+    """
+    ds = invent.DataStore()
+    ds.clear()
+    ds["orders/old"] = {"status": "open", "total": 5}
+    orders = ds.collection("orders", indexes=["status", "total"])
+    assert ds.collection("orders") is orders
+    mock_publish = umock.Mock()
+    with umock.patch("invent.datastore:publish", mock_publish):
+        orders.put("A1", {"status": "open", "total": 42, "who": "Ada"})
+    assert mock_publish.call_args_list[0][0][0]._subject == "orders/A1"
+    orders.put(2, {"status": "paid", "total": 100, "who": "Bob"})
+    orders.put("A3", {"status": "open", "total": 250, "who": "Bob"})
+    assert len(orders) == 4
+    assert sorted(orders.ids()) == ["2", "A1", "A3", "old"]
+    assert orders.get(2)["who"] == "Bob"
+
+    def totals(records):
+        return sorted(record["total"] for record in records)
+
+    assert totals(orders.find(status="open")) == [5, 42, 250]
+    assert totals(orders.find(status="open", who="Bob")) == [250]
+    assert totals(orders.find(who="Bob")) == [100, 250]
+    assert orders.find(status="lost") == []
+    assert orders.find(status="open", total=7) == []
+    assert totals(orders.range("total", 10, 250)) == [42, 100]
+    assert totals(orders.range("total", low=100)) == [100, 250]
+    # Updates, and changes made other than via the collection, are indexed.
+    orders.update("A1", status="paid")
+    assert totals(orders.find(status="paid")) == [42, 100]
+    ds["orders/A3"] = {"status": "paid", "total": 1}
+    assert totals(orders.find(status="paid")) == [1, 42, 100]
+    assert totals(orders.range("total", high=10)) == [1, 5]
+    orders.delete("2")
+    del ds["orders/old"]
+    assert "2" not in orders
+    assert totals(orders.find(status="paid")) == [1, 42]
+    assert orders.find(status="open") == []
+    # Indexes can be added later.
+    orders.add_index("who")
+    assert totals(orders.find(who="Ada")) == [42]
+    with upytest.raises(ValueError):
+        orders.range("missing")
+    # Changes in a transaction are indexed once it's committed, and not at
+    # all if it's thrown away.
+    with upytest.raises(RuntimeError):
+        with ds.transaction():
+            orders.put("B1", {"status": "open", "total": 3})
+            orders.delete("A1")
+            raise RuntimeError("Boom")
+    assert sorted(orders.ids()) == ["A1", "A3"]
+    assert orders.find(status="open") == []
+    with ds.transaction():
+        orders.put("B1", {"status": "open", "total": 3})
+        orders.update("A3", status="open")
+        assert orders.find(status="open") == []
+    assert totals(orders.find(status="open")) == [1, 3]
+    assert len(orders) == 3
+    ds.clear()
+    assert len(orders) == 0
+
+
+def test_datastore_collection_computed_lazy():
+    """
+    A collection doesn't count as being subscribed to the items in the data
+    store, so computed items stay lazy.
+    """
+    ds = invent.DataStore()
+    calls = []
+
+    def double(x):
+        calls.append(1)
+        return (x or 0) * 2
+
+    ds.computed("double", double, depends_on=["x"])
+    ds.collection("things", indexes=["kind"])
+    ds["x"] = 1
+    ds["x"] = 2
+    assert len(calls) == 0
+    assert ds["double"] == 4
+    assert len(calls) == 1
+
+
+# Tests for MemoryBackend based datastore.
+
+
+def test_memory_backend():
+    """
+    Values are stored as they are, without being serialized, and all the
+    usual features work.
+    """
+    ds = invent.DataStore(_backend=MemoryBackend(), a=1)
+    rows = [[1, 2], [3, 4]]
+    ds["rows"] = rows
+    ds["text"] = "\x00e not an expiry"
+    ds["data"] = b"\x00\xff"
+    ds["object"] = object
+    assert ds.backend["rows"] is rows
+    assert ds["rows"] is rows
+    assert ds["a"] == 1
+    assert ds["text"] == "\x00e not an expiry"
+    assert ds["data"] == b"\x00\xff"
+    assert ds["object"] is object
+    assert ds.cache_stats()["size"] == 0
+    with upytest.raises(ValueError):
+        ds.patch("rows", [{"op": "remove", "path": [5]}])
+    assert ds["rows"] == [[1, 2], [3, 4]]
+    ds.patch("rows", [{"op": "append", "path": [0], "value": 5}])
+    assert ds["rows"] == [[1, 2, 5], [3, 4]]
+    ds.set("gone", 1, ttl=0)
+    ds.set("kept", {"x": 1}, ttl=3600)
+    assert "gone" not in ds
+    assert ds["kept"] == {"x": 1}
+    assert ds.remove_expired() == 1
+    with ds.transaction():
+        ds["b"] = 2
+        del ds["a"]
+        assert ds["b"] == 2
+    assert sorted(ds.keys()) == ["b", "data", "kept", "object", "rows", "text"]
+    assert ds.usage()["keys"] == 6
+    with upytest.raises(ValueError):
+        ds.share("test", _channel_class=_LocalBroadcastChannel)
+
+
+def test_memory_backend_validate():
+    """
+    When asked to validate, values that couldn't be serialized are refused.
+    """
+    ds = invent.DataStore(_backend=MemoryBackend(validate=True))
+    ds["ok"] = {"a": [1, 2]}
+    ds["bytes"] = b"ok"
+    with upytest.raises(ValueError):
+        ds["bad"] = object
+    assert "bad" not in ds
+    # Other backends storing objects needn't say whether to validate.
+    backend = MemoryBackend()
+    del backend.validate
+    ds = invent.DataStore(_backend=backend)
+    ds["fine"] = object
+    assert ds["fine"] is object
+
+
+# Tests for JournalBackend based datastore.
+
+
+def test_journal_recover():
+    """
+    Changes are recorded as entries in the journal, from which the items
+    are recovered. Patches only record their operations.
+    """
+    store = _FakeStorage()
+    ds = invent.DataStore(_backend=JournalBackend(store))
+    ds["readings"] = [1]
+    ds["other"] = "x"
+    ds.patch("readings", [{"op": "append", "path": [], "value": 2}])
+    del ds["other"]
+    assert ds.backend.journal_length() == 4
+    assert json.loads(store["journal-3"]) == [
+        "patch",
+        "readings",
+        [{"op": "append", "path": [], "value": 2}],
+    ]
+    recovered = invent.DataStore(_backend=JournalBackend(store))
+    assert recovered.keys() == ["readings"]
+    assert recovered["readings"] == [1, 2]
+    # Recovery stops at a gap in the journal.
+    store["journal-6"] = json.dumps(["set", "lost", "1"])
+    assert "lost" not in JournalBackend(store)
+
+
+def test_journal_compact():
+    """
+    Every so often the entries are compacted into a snapshot. Entries left
+    behind by an interrupted compaction are removed on recovery.
+    """
+    store = _FakeStorage()
+    backend = JournalBackend(store, compact_every=3)
+    ds = invent.DataStore(_backend=backend)
+    ds["log"] = [0]
+    for i in range(1, 4):
+        ds.patch("log", [{"op": "append", "path": [], "value": i}])
+    assert backend.journal_length() == 1
+    assert sorted(store.keys()) == ["journal-4", "snapshot"]
+    store["journal-2"] = json.dumps(["delete", "log"])
+    recovered = JournalBackend(store)
+    assert "journal-2" not in store
+    assert json.loads(recovered["log"]) == [0, 1, 2, 3]
+    ds.clear()
+    assert sorted(store.keys()) == ["snapshot"]
+    assert len(JournalBackend(store)) == 0
+
+
 # Tests for IndexDBBackend based datastore.
 
 
@@ -507,6 +1397,24 @@ async def test_index_db_len():
     assert len(ds) == 1
 
 
+async def test_index_db_bulk():
+    """
+    The bulk methods work directly with the backend, and sync once.
+    """
+    await invent.start_datastore(_backend=IndexDBBackend)
+    backend = invent.datastore.backend
+    backend.sync = umock.AsyncMock()
+    await backend.set_many({"a": 1, "b": 2, "c": 3})
+    assert backend.sync.call_count == 1
+    assert await backend.get_many(["a", "c", "d"]) == {"a": 1, "c": 3}
+    await backend.delete_many(["a", "b"])
+    assert backend.sync.call_count == 2
+    result = []
+    async for key, value in backend.iter_range():
+        result.append((key, value))
+    assert result == [("c", 3)]
+
+
 async def test_index_db_get_set_del_item():
     """
     Getting, setting and deleting an item should work as expected.
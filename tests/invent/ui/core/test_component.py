@@ -141,6 +141,43 @@ def test_component_properties():
     assert isinstance(properties["favourite_colour"], core.ChoiceProperty)
 
 
+def test_component_properties_and_events_are_cached_per_class():
+    """
+    A component's properties and events are worked out once per class, and
+    can't be changed. A subclass has its own properties and events.
+    """
+
+    class MyWidget(core.Widget):
+
+        foo = core.TextProperty("This is a foo", default_value="bar")
+        clicked = core.Event("Something was clicked.")
+
+    class MyOtherWidget(MyWidget):
+
+        bar = core.TextProperty("This is a bar", default_value="baz")
+
+    properties = MyWidget.properties()
+    assert MyWidget.properties() is properties
+    assert MyWidget.events() is MyWidget.events()
+    assert "foo" in properties
+    assert "bar" not in properties
+    assert "clicked" in MyWidget.events()
+    # The subclass gets its own registry, including what it inherits.
+    assert "foo" in MyOtherWidget.properties()
+    assert "bar" in MyOtherWidget.properties()
+    assert "clicked" in MyOtherWidget.events()
+    # Properties are in name order.
+    names = list(MyOtherWidget.properties())
+    assert names == sorted(names)
+    with upytest.raises(TypeError):
+        properties["bar"] = core.TextProperty("Nope")
+    with upytest.raises(TypeError):
+        del properties["foo"]
+    with upytest.raises(TypeError):
+        properties.update({})
+    assert "bar" not in MyWidget.properties()
+
+
 def test_component_definition():
     """
     A JSON serializable data structure representing the component class is
@@ -146,6 +146,31 @@ def test_from_datastore_react_on_change():
     assert invent.datastore["test"] == "value1"
 
 
+def test_from_datastore_patched():
+    """
+    If a property's value from_datastore is patched, and the object has an
+    on_FOO_patched method, it is called with the ops rather than
+    on_FOO_changed.
+    """
+
+    class FakeWidget(Component):
+        my_property = ListProperty("A test property")
+
+        def render(self):
+            return div()
+
+    invent.datastore["test"] = [1, 2]
+    fw = FakeWidget()
+    fw.my_property = from_datastore("test")
+    fw.on_my_property_changed = umock.Mock()
+    fw.on_my_property_patched = umock.Mock()
+    ops = [{"op": "append", "path": [], "value": 3}]
+    invent.datastore.patch("test", ops)
+    assert fw.my_property == [1, 2, 3]
+    fw.on_my_property_patched.assert_called_once_with(ops)
+    assert fw.on_my_property_changed.call_count == 0
+
+
 def test_property_react_on_change():
     """
     If the property is given a map_to_attribute and the parent object has an
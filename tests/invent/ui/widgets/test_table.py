@@ -0,0 +1,96 @@
+import invent
+from invent.ui import Table, from_datastore
+
+
+def cells(section):
+    """
+    Return the text of each cell in each row of the given table `section`
+    (its head or body), as a list of lists.
+    """
+    rows = section._dom_element.rows
+    result = []
+    for i in range(rows.length):
+        row = rows[i].cells
+        result.append([row[j].textContent for j in range(row.length)])
+    return result
+
+
+def make_table(data, **kwargs):
+    """
+    Return a table showing the `data`, stored in the datastore under
+    "rows", and a list that records each time the table is rebuilt.
+    """
+    invent.datastore["rows"] = data
+    table = Table(data=from_datastore("rows"), **kwargs)
+    rebuilt = []
+    tabulate = table._tabulate
+
+    def counting_tabulate():
+        rebuilt.append(True)
+        tabulate()
+
+    table._tabulate = counting_tabulate
+    return table, rebuilt
+
+
+def test_table_patch_rows():
+    """
+    Appending, changing and removing rows in the table's body updates only
+    those rows, rather than rebuilding the table.
+    """
+    table, rebuilt = make_table([["Name", "Age"], ["Ann", "30"]])
+    assert cells(table._table_head) == [["Name", "Age"]]
+    invent.datastore.patch(
+        "rows", [{"op": "append", "path": [], "value": ["Bob", "40"]}]
+    )
+    assert cells(table._table_body) == [["Ann", "30"], ["Bob", "40"]]
+    invent.datastore.patch(
+        "rows", [{"op": "set", "path": [1, 1], "value": "31"}]
+    )
+    assert cells(table._table_body) == [["Ann", "31"], ["Bob", "40"]]
+    invent.datastore.patch("rows", [{"op": "remove", "path": [1]}])
+    assert cells(table._table_body) == [["Bob", "40"]]
+    assert cells(table._table_head) == [["Name", "Age"]]
+    assert rebuilt == []
+
+
+def test_table_patch_header_row():
+    """
+    Changing the header row rebuilds the table.
+    """
+    table, rebuilt = make_table([["Name", "Age"], ["Ann", "30"]])
+    invent.datastore.patch(
+        "rows", [{"op": "set", "path": [0, 1], "value": "Years"}]
+    )
+    assert cells(table._table_head) == [["Name", "Years"]]
+    assert cells(table._table_body) == [["Ann", "30"]]
+    assert rebuilt == [True]
+
+
+def test_table_patch_empty():
+    """
+    Adding the first rows to an empty table rebuilds it, so the first row
+    becomes the header row.
+    """
+    table, rebuilt = make_table([])
+    invent.datastore.patch(
+        "rows", [{"op": "append", "path": [], "value": ["Name", "Age"]}]
+    )
+    assert cells(table._table_head) == [["Name", "Age"]]
+    assert cells(table._table_body) == []
+    invent.datastore.patch(
+        "rows", [{"op": "append", "path": [], "value": ["Ann", "30"]}]
+    )
+    assert cells(table._table_body) == [["Ann", "30"]]
+    assert rebuilt == [True, True]
+    # Without column headers, every row is in the body.
+    table, rebuilt = make_table([], column_headers=False)
+    invent.datastore.patch(
+        "rows", [{"op": "append", "path": [], "value": ["Ann", "30"]}]
+    )
+    invent.datastore.patch(
+        "rows", [{"op": "append", "path": [], "value": ["Bob", "40"]}]
+    )
+    assert cells(table._table_head) == []
+    assert cells(table._table_body) == [["Ann", "30"], ["Bob", "40"]]
+    assert rebuilt == [True]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Measure how quickly a `DataStore` works on top of each of the available
+backends, so the right one can be chosen for an app.
+
+Run from the root of the repository:
+
+```
+python utils/bench_datastore.py
+python utils/bench_datastore.py --count 50000
+```
+
+The same workload is run against every backend, via a `DataStore` (as an
+app would use it). The browser's `localStorage` and `indexedDB` are played
+by the Python stand-ins in `stand_in.py`, so the cost of calling JavaScript
+isn't included. Reports, in operations per second:
+
+* `write` - setting an item.
+* `read` - getting an item (more items than the data store keeps to hand).
+* `reread` - getting an item that was read just before.
+* `keys` - getting all the keys.
+* `len` - counting the items.
+"""
+
+import argparse
+import time
+
+import stand_in
+
+stand_in.install()
+
+from pyscript import Storage  # noqa: E402
+from invent.datastore import (  # noqa: E402
+    DataStore,
+    IndexDBBackend,
+    JournalBackend,
+    LocalStorageBackend,
+    MemoryBackend,
+)
+
+#: A typical record, as stored by an app.
+RECORD = {"name": "Ada", "scores": [1, 2, 3], "active": True}
+
+
+def backends():
+    """
+    Return a list of `(name, make)` pairs, where `make` returns a new,
+    empty, backend.
+    """
+
+    def local_storage():
+        backend = LocalStorageBackend()
+        backend.clear()
+        # Gather the (no) keys now, so it isn't part of the first read.
+        backend.keys()
+        return backend
+
+    return [
+        ("MemoryBackend", MemoryBackend),
+        ("MemoryBackend(validate)", lambda: MemoryBackend(validate=True)),
+        ("LocalStorageBackend", local_storage),
+        ("IndexDBBackend", IndexDBBackend),
+        ("JournalBackend", lambda: JournalBackend(Storage())),
+    ]
+
+
+def ops_per_second(func, count):
+    """
+    Return how many times a second `func` (which does `count` operations)
+    does an operation.
+    """
+    start = time.perf_counter()
+    func()
+    taken = time.perf_counter() - start
+    return count / taken if taken else float("inf")
+
+
+def measure(make, count):
+    """
+    Return a dictionary of operations per second for each part of the
+    workload, run against a `DataStore` on the backend returned by `make`.
+    """
+    datastore = DataStore(_backend=make())
+    keys = [f"key-{i}" for i in range(count)]
+    # Reading the keys and counting the items are slower, so do less.
+    repeats = max(1, count // 100)
+
+    def write():
+        for key in keys:
+            datastore[key] = RECORD
+
+    def read():
+        for key in keys:
+            datastore[key]
+
+    def reread():
+        for key in keys:
+            datastore[key]
+            datastore[key]
+
+    def all_keys():
+        for _ in range(repeats):
+            datastore.keys()
+
+    def length():
+        for _ in range(repeats):
+            len(datastore)
+
+    return {
+        "write": ops_per_second(write, count),
+        "read": ops_per_second(read, count),
+        "reread": ops_per_second(reread, count * 2),
+        "keys": ops_per_second(all_keys, repeats),
+        "len": ops_per_second(length, repeats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--count", type=int, default=10_000, help="items to write and read"
+    )
+    args = parser.parse_args()
+    columns = ("write", "read", "reread", "keys", "len")
+    print(f"{args.count} items, operations per second")
+    print(f"{'':24}" + "".join(f"{name:>12}" for name in columns))
+    for name, make in backends():
+        result = measure(make, args.count)
+        print(
+            f"{name:24}"
+            + "".join(f"{result[column]:12,.0f}" for column in columns)
+        )
+
+
+if __name__ == "__main__":
+    main()
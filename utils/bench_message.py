@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Compare the cost of creating a `Message` with the original implementation,
+which set each keyword argument as an attribute of the instance in turn.
+
+Run from the root of the repository:
+
+```
+python utils/bench_message.py
+```
+
+Reports, per message:
+
+* `alloc` - the bytes allocated while creating a message, including the
+  temporary `**kwargs` dictionary (i.e. the churn for the garbage collector).
+* `kept` - the bytes still used by a message that is kept alive.
+* `create` - the microseconds taken to create a message.
+* `create+read` - the microseconds taken to create a message and read two
+  items of its content, as a typical handler would.
+* `1-in-10` - the microseconds taken per message when only one in ten is
+  read, as happens when messages are throttled, debounced or coalesced (or
+  published with nothing subscribed).
+
+The current implementation is quicker to create and allocates less, but
+reading its content is slower and a message kept alive takes more memory.
+"""
+
+import time
+import tracemalloc
+
+import stand_in
+
+stand_in.install()
+
+from invent.channels import Message  # noqa: E402
+
+
+class LegacyMessage:
+    """
+    The original `Message`, kept here for comparison.
+    """
+
+    def __init__(self, subject, **kwargs):
+        self._subject = subject
+        for k, v in kwargs.items():
+            setattr(self, k, v)
+
+
+#: How many messages to create for each measurement.
+COUNT = 100_000
+#: How many times to repeat each timing.
+REPEATS = 5
+
+
+def allocated_per_message(cls):
+    """
+    Return the average number of bytes allocated at the busiest moment while
+    creating (and then discarding) a message of the given `cls`.
+    """
+    total = 0
+    tracemalloc.start()
+    for i in range(COUNT // 100):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        cls("change", value=i, source=None)
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / (COUNT // 100)
+
+
+def kept_per_message(cls):
+    """
+    Return the average number of bytes used by each message of the given
+    `cls` that is kept alive.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [cls("change", value=i, source=None) for i in range(COUNT)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Don't count the list holding the messages.
+    return (after - before - kept.__sizeof__()) / COUNT
+
+
+def microseconds_to_create(cls, read_every=0):
+    """
+    Return the average time, in microseconds, to create a message of the
+    given `cls` and, if `read_every` is given, read the content of one in
+    every that many messages. The best of `REPEATS` runs is used, to reduce
+    noise from the rest of the computer.
+    """
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        if read_every:
+            for i in range(COUNT):
+                message = cls("change", value=i, source=None)
+                if i % read_every == 0:
+                    message.value
+                    message.source
+        else:
+            for i in range(COUNT):
+                cls("change", value=i, source=None)
+        taken = time.perf_counter() - start
+        best = taken if best is None else min(best, taken)
+    return best / COUNT * 1_000_000
+
+
+def main():
+    print(
+        f"{'':10} {'alloc':>8} {'kept':>8} {'create':>8}"
+        f" {'create+read':>12} {'1-in-10':>8}"
+    )
+    for name, cls in (("legacy", LegacyMessage), ("current", Message)):
+        print(
+            f"{name:10}"
+            f" {allocated_per_message(cls):8.1f}"
+            f" {kept_per_message(cls):8.1f}"
+            f" {microseconds_to_create(cls):8.3f}"
+            f" {microseconds_to_create(cls, read_every=1):12.3f}"
+            f" {microseconds_to_create(cls, read_every=10):8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Stand-ins for PyScript's browser modules, so parts of Invent can be imported
+and benchmarked with CPython from the command line.
+
+These stand-ins only do enough to import `invent` and exercise its channels
+and datastore. Nothing is drawn, and `window.localStorage` is a Python `dict`
+with the same methods as the browser's `Storage` object. Call `install()`
+before importing `invent`. Inside the browser, the real modules are always
+used.
+"""
+
+import os
+import sys
+import time
+import types
+
+
+class LocalStorage(dict):
+    """
+    A Python `dict` that looks like the browser's `window.localStorage`.
+    """
+
+    @property
+    def length(self):
+        return len(self)
+
+    def key(self, i):
+        return list(self.keys())[i]
+
+    def getItem(self, key):
+        return self.get(key)
+
+    def setItem(self, key, value):
+        self[key] = str(value)
+
+    def removeItem(self, key):
+        self.pop(key, None)
+
+
+class _Anything:
+    """
+    Stands in for any JavaScript object: every attribute and call returns
+    another `_Anything`.
+    """
+
+    def __getattr__(self, name):
+        return _Anything()
+
+    def __call__(self, *args, **kwargs):
+        return _Anything()
+
+    def __iter__(self):
+        return iter(())
+
+    def __bool__(self):
+        return False
+
+
+class _Storage(dict):
+    """
+    Stands in for PyScript's IndexedDB backed `Storage` class.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+
+    async def sync(self):
+        return
+
+
+def install():
+    """
+    Install the stand-in modules, unless the real PyScript is available.
+    """
+    try:
+        import pyscript  # noqa
+
+        return
+    except ImportError:
+        pass
+    window = _Anything()
+    window.localStorage = LocalStorage()
+    window.navigator = types.SimpleNamespace(language="en", languages=["en"])
+    window.setTimeout = lambda func, delay=0: 0
+    window.clearTimeout = lambda handle: None
+    window.performance = types.SimpleNamespace(
+        now=lambda: time.perf_counter() * 1000
+    )
+    window.Date = types.SimpleNamespace(now=lambda: time.time() * 1000)
+
+    async def storage(name, storage_class=_Storage):
+        return storage_class()
+
+    async def js_import(*urls):
+        return [None for _ in urls]
+
+    pyscript = types.ModuleType("pyscript")
+    pyscript.window = window
+    pyscript.document = _Anything()
+    pyscript.Storage = _Storage
+    pyscript.storage = storage
+    pyscript.js_import = js_import
+    ffi = types.ModuleType("pyscript.ffi")
+    ffi.create_proxy = lambda func: func
+    ffi.to_js = lambda obj, **kwargs: obj
+    web = types.ModuleType("pyscript.web")
+    web.page = _Anything()
+    for name in ("div", "link", "style"):
+        setattr(web, name, _Anything())
+    pyscript.ffi = ffi
+    pyscript.web = web
+    sys.modules["pyscript"] = pyscript
+    sys.modules["pyscript.ffi"] = ffi
+    sys.modules["pyscript.web"] = web
+    src = os.path.join(os.path.dirname(__file__), "..", "src")
+    sys.path.insert(0, os.path.abspath(src))